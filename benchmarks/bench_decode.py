@@ -0,0 +1,133 @@
+"""Decoding GET replies: ElementTree vs. the streaming decoder.
+
+Compares time per poll and memory for turning the recorded replies of all
+groups into a snapshot. The tree variant parses every reply with
+ET.fromstring and walks the tree like the coordinator used to; the tree is
+kept afterwards, as coordinator.data did. The streaming variant uses
+LuxtronikSnapshot.addReply, which never builds a tree, once with
+decodeValue per item and once with the parsers a ValueDecoder compiled
+from the first poll.
+
+The value decoding alone is compared as well, and the entity side: the
+suffix slicing (plus the locale lookup) every entity used to do on each
+update against reading the decoded number.
+"""
+import locale
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from common import bench, loadResponses
+
+from custom_components.luxtronikws.coordinator import SNAPSHOT_GROUPS
+from custom_components.luxtronikws.snapshot import (
+    LuxtronikSnapshot,
+    SnapshotGroup,
+    ValueDecoder,
+    compileParser,
+    decodeValue,
+)
+
+# characters the entity classes used to cut off, by group
+SUFFIX_LEN = {
+    "temperatures": 2, "tempSettings": 2, "inputs": 4, "outputs": 2, "energyOutputs": 4, "energyInputs": 4,
+    "hours": 1, "deviceinfo": 3, "times": 0,
+}
+
+# value texts the fixtures do not have and what they decode to
+SAMPLES = {
+    "4,3°C": 4.3, "-2,5 K": -2.5, "0,3": 0.3, "4.3°C": 4.3, "12345h": 12345,
+    "1.234,5": "1.234,5", "4,3,2": "4,3,2", "---": "---", "01:49": 6540,
+}
+
+
+def addElements(snapshot, group, elements):
+    indices, names, raws = [], [], []
+    for index, item in enumerate(elements):
+        sublist = list(item)
+        if len(sublist) != 2:
+            continue
+        indices.append(index)
+        names.append(sublist[0].text)
+        raws.append(sublist[1].text or "")
+    snapshot.groups[group] = SnapshotGroup(indices, names, raws, [decodeValue(raw) for raw in raws])
+
+
+def treeDecode(responses):
+    snapshot = LuxtronikSnapshot()
+    roots = {}
+    for group, result in responses.items():
+        root = roots[group] = ET.fromstring(result)
+        if group in SNAPSHOT_GROUPS:
+            for snapshotGroup, element in zip(SNAPSHOT_GROUPS[group], root):
+                addElements(snapshot, snapshotGroup, element)
+        else:
+            addElements(snapshot, group, root)
+    return snapshot, roots
+
+
+def streamDecode(responses):
+    snapshot = LuxtronikSnapshot()
+    for group, result in responses.items():
+        snapshot.addReply(group, result, SNAPSHOT_GROUPS.get(group))
+    return snapshot
+
+
+def compiledDecode(responses, decoder):
+    snapshot = LuxtronikSnapshot()
+    for group, result in responses.items():
+        snapshot.addReply(group, result, SNAPSHOT_GROUPS.get(group), decoder)
+    return snapshot
+
+
+def stripSuffix(raw, suffixLen):
+    valuestr = raw[:len(raw)-suffixLen]
+    point = locale.localeconv()["decimal_point"]
+    valuestr.replace(".", point)
+    valuestr.replace(",", point)
+    return valuestr
+
+
+def memory(func, responses):
+    """Peak and retained bytes allocated while decoding one poll."""
+    tracemalloc.start()
+    result = func(responses)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak, retained
+
+
+def main() -> None:
+    responses = loadResponses()
+    tree, _ = treeDecode(responses)
+    stream = streamDecode(responses)
+    items = stream.items()
+    assert tree.items() == items, "decoders disagree"
+    print(f"{len(items)} items, {sum(map(len, responses.values()))} bytes of XML")
+
+    for raw, expected in SAMPLES.items():
+        parser, _ = compileParser(raw)
+        assert decodeValue(raw) == expected and parser(raw) == expected, "wrong value for "+raw
+
+    decoder = ValueDecoder()
+    assert compiledDecode(responses, decoder).items() == items, "compiled parsers disagree"
+    groupRaws = {}
+    for (group, _), item in items.items():
+        groupRaws.setdefault(group, []).append(item.raw)
+    raws = [(group, raw) for group, values in groupRaws.items() for raw in values]
+
+    bench("decode poll, ElementTree", lambda: treeDecode(responses))
+    bench("decode poll, streaming", lambda: streamDecode(responses))
+    bench("decode poll, streaming, compiled", lambda: compiledDecode(responses, decoder))
+    bench("decode values, decodeValue", lambda: [decodeValue(raw) for _, raw in raws])
+    bench("decode values, compiled", lambda: [decoder.decodeGroup(group, values) for group, values in groupRaws.items()])
+    bench("entity values, suffix slicing", lambda: [stripSuffix(raw, SUFFIX_LEN[group]) for group, raw in raws])
+    bench("entity values, decoded", lambda: [item.value for item in items.values()])
+
+    for label, func in (("ElementTree", treeDecode), ("streaming", streamDecode)):
+        peak, retained = memory(func, responses)
+        print(f"memory, {label:<31} peak {peak / 1024:7.1f} KiB, retained {retained / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
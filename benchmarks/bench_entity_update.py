@@ -0,0 +1,95 @@
+"""Per-poll entity update cost: Element tree walks vs. snapshot lookups.
+
+Both variants start from the recorded GET replies. The tree variant parses
+them into Element trees and lets every entity walk the tree the way
+stripSuffix used to (list(root), listed[index], list(item)[1].text); the
+snapshot variant builds the LuxtronikSnapshot once and every entity does
+a single dict lookup.
+"""
+import xml.etree.ElementTree as ET
+
+from common import bench, loadResponses
+
+from custom_components.luxtronikws.coordinator import SNAPSHOT_GROUPS, LuxtronikCoordinator
+from custom_components.luxtronikws.snapshot import LuxtronikSnapshot
+
+# characters stripped from the value by the entity class of each dict list
+SUFFIX_LEN = {
+    "tempDicts": 2, "pressureDicts": 4, "frequencyDicts": 3, "percentageDicts": 2, "powerDicts": 3,
+    "energyDicts": 4, "timeDicts": None, "stringDicts": 0, "binaryDicts": 0, "hourDicts": 1, "counterDicts": 0,
+}
+
+
+class Catalog:
+    """Just enough of the coordinator to run listEntities on a snapshot."""
+
+    listEntities = LuxtronikCoordinator.listEntities
+
+    def __init__(self, data) -> None:
+        self.data = data
+
+
+def buildSnapshot(responses):
+    snapshot = LuxtronikSnapshot()
+    for group, result in responses.items():
+        snapshot.addReply(group, result, SNAPSHOT_GROUPS.get(group))
+    return snapshot
+
+
+def buildTrees(responses):
+    roots = {group: ET.fromstring(result) for group, result in responses.items()}
+    energyroot = roots.pop("energy")
+    roots["energyOutputs"] = list(energyroot)[0]
+    roots["energyInputs"] = list(energyroot)[1]
+    return roots
+
+
+def treeValue(roots, group, index, suffixLen):
+    listed = list(roots[group])
+    item = listed[index]
+    valuestr = list(item)[1].text
+    if suffixLen is None:
+        parts = list(map(int, valuestr.split(":")))
+        return str(float(parts[0] * 3600 + parts[1] * 60 + (parts[2] if len(parts) > 2 else 0)))
+    return valuestr[:len(valuestr)-suffixLen]
+
+
+def snapshotValue(snapshot, group, index, suffixLen):
+    item = snapshot.get(group, index)
+    if suffixLen is None:
+        return str(float(item.value))
+    valuestr = item.raw
+    return valuestr[:len(valuestr)-suffixLen]
+
+
+def main() -> None:
+    responses = loadResponses()
+    dicts = Catalog(buildSnapshot(responses)).listEntities()
+    entities = [
+        (entity["group"], entity["index"], SUFFIX_LEN[kind])
+        for kind, entityDicts in dicts.items()
+        for entity in entityDicts
+    ]
+    print(f"{len(entities)} entities")
+
+    def treePoll():
+        roots = buildTrees(responses)
+        for group, index, suffixLen in entities:
+            treeValue(roots, group, index, suffixLen)
+
+    def snapshotPoll():
+        snapshot = buildSnapshot(responses)
+        for group, index, suffixLen in entities:
+            snapshotValue(snapshot, group, index, suffixLen)
+
+    roots = buildTrees(responses)
+    snapshot = buildSnapshot(responses)
+
+    bench("entity updates, element trees", lambda: [treeValue(roots, *entity) for entity in entities])
+    bench("entity updates, snapshot", lambda: [snapshotValue(snapshot, *entity) for entity in entities])
+    bench("full poll, element trees", treePoll)
+    bench("full poll, snapshot", snapshotPoll)
+
+
+if __name__ == "__main__":
+    main()
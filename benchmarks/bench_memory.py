@@ -0,0 +1,105 @@
+"""Steady-state memory and per-poll allocations of the coordinator and entities.
+
+The coordinator polls the local simulator with every group due on every
+poll and all sensor entities attached. After a warm-up, tracemalloc reports
+how much memory the snapshot and the entities hold, how much every poll
+allocates on top of that and whether anything is retained from poll to
+poll.
+
+    python benchmarks/bench_memory.py --polls 200 --variation 0.2
+"""
+import argparse
+import asyncio
+import gc
+import tempfile
+import tracemalloc
+
+from common import GROUPS, loadResponses, makeEntities, makeEntry, makeHass
+from simulator import LuxSimulator
+
+from custom_components.luxtronikws.coordinator import SNAPSHOT_GROUPS, LuxtronikCoordinator
+from custom_components.luxtronikws.snapshot import LuxtronikSnapshot
+
+
+def traced(func):
+    """Result of func and the bytes still allocated by it afterwards."""
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - before
+
+
+def snapshotSizes(responses) -> None:
+    """Bytes held by a snapshot built from scratch and by one sharing the previous poll."""
+
+    def build(previous=None):
+        snapshot = LuxtronikSnapshot()
+        for group, result in responses.items():
+            snapshot.addReply(group, result, SNAPSHOT_GROUPS.get(group), previous=previous)
+        return snapshot
+
+    first, fresh = traced(build)
+    # keep the flat dict alive while measuring it
+    items, flat = traced(first.items)
+    _, shared = traced(lambda: build(first))
+    print(f"{len(items)} items")
+    print(f"{'snapshot, from scratch':<40} {fresh / 1024:8.1f} KiB")
+    print(f"{'snapshot, unchanged poll':<40} {shared / 1024:8.1f} KiB")
+    print(f"{'same items as a (group, index) dict':<40} {flat / 1024:8.1f} KiB")
+
+
+async def pollSizes(hass, polls: int, warmup: int) -> None:
+    entry = makeEntry(options={"interval_"+group: 0 for group in GROUPS})
+    coordinator = LuxtronikCoordinator(hass, entry)
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success, coordinator.last_exception
+
+    entities, entityBytes = traced(lambda: makeEntities(hass, coordinator))
+    for entity in entities:
+        coordinator.async_add_listener(entity._handle_coordinator_update, entity.coordinator_context)
+    print(f"{'entity objects':<40} {entityBytes / len(entities):8.0f} B each, {len(entities)} entities")
+
+    for _ in range(warmup):
+        await coordinator.async_refresh()
+
+    gc.collect()
+    start = tracemalloc.get_traced_memory()[0]
+    collections = gc.get_stats()[0]["collections"]
+    peaks = []
+    for _ in range(polls):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await coordinator.async_refresh()
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    gc.collect()
+    growth = tracemalloc.get_traced_memory()[0] - start
+    collections = gc.get_stats()[0]["collections"] - collections
+    await coordinator.async_shutdown()
+
+    peaks.sort()
+    print(f"{'allocated per poll, p50':<40} {peaks[len(peaks) // 2] / 1024:8.1f} KiB")
+    print(f"{'allocated per poll, max':<40} {peaks[-1] / 1024:8.1f} KiB")
+    print(f"{'young GC collections per poll':<40} {collections / polls:8.2f}")
+    print(f"{'retained after ' + str(polls) + ' polls':<40} {growth / 1024:8.1f} KiB")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--variation", type=float, default=0.2, help="probability of a value changing per request")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    snapshotSizes(loadResponses())
+    with tempfile.TemporaryDirectory() as configDir:
+        hass = await makeHass(configDir)
+        async with LuxSimulator(variation=args.variation, seed=1):
+            await pollSizes(hass, args.polls, args.warmup)
+        await hass.async_stop(force=True)
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
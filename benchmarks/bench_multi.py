@@ -0,0 +1,70 @@
+"""Several controllers polled through the shared scheduler.
+
+Starts one simulator per controller on 127.0.0.1, 127.0.0.2, ... and lets
+LuxtronikScheduler poll all of them for a while. Reports event-loop lag and
+the per-controller latency the scheduler records, so runs with a growing
+number of units can be compared.
+
+    python benchmarks/bench_multi.py --controllers 8 --interval 1 --seconds 30
+"""
+import argparse
+import asyncio
+import tempfile
+
+from common import LoopLagMonitor, makeEntities, makeEntry, makeHass
+from simulator import LuxSimulator
+
+from custom_components.luxtronikws.coordinator import LuxtronikCoordinator
+from custom_components.luxtronikws.scheduler import getScheduler
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--controllers", type=int, default=4)
+    parser.add_argument("--interval", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    simulators = [
+        LuxSimulator(host=f"127.0.0.{number + 1}", latency=args.latency, variation=0.2, seed=number)
+        for number in range(args.controllers)
+    ]
+    for simulator in simulators:
+        await simulator.start()
+
+    with tempfile.TemporaryDirectory() as configDir:
+        hass = await makeHass(configDir)
+        scheduler = getScheduler(hass)
+        coordinators = []
+        for simulator in simulators:
+            coordinator = LuxtronikCoordinator(hass, makeEntry(simulator.host, updateInterval=args.interval))
+            await coordinator.async_refresh()
+            for entity in makeEntities(hass, coordinator):
+                coordinator.async_add_listener(entity._handle_coordinator_update, entity.coordinator_context)
+            coordinators.append(coordinator)
+            scheduler.async_add(coordinator)
+
+        monitor = LoopLagMonitor()
+        monitor.start()
+        await asyncio.sleep(args.seconds)
+        await monitor.stop()
+
+        monitor.report(f"{args.controllers} controllers")
+        for server, latency in scheduler.latencies().items():
+            print(
+                f"{server:<40} {latency['polls']:5d} polls, last wait {latency['wait'] * 1e3:7.2f} ms,"
+                f" last poll {latency['poll'] * 1e3:7.2f} ms"
+            )
+
+        for coordinator in coordinators:
+            scheduler.async_remove(coordinator)
+            await coordinator.async_shutdown()
+        await hass.async_stop(force=True)
+
+    for simulator in simulators:
+        await simulator.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+"""End-to-end benchmark against the local Luxtronik simulator.
+
+Drives getWebsocket, LuxtronikCoordinator._async_update_data, listEntities
+and the sensor update path against benchmarks/simulator.py and reports poll
+latency, parse time, allocations and event-loop blocking time. The "loop"
+phase is the time each poll held the event loop as measured by the
+coordinator itself; --decode-executor-size 0 decodes every poll in the
+executor.
+
+    python benchmarks/bench_poll.py --polls 200 --latency 0.02 --jitter 0.01
+    python benchmarks/bench_poll.py --decode-executor-size 0
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from common import LoopLagMonitor, bench, loadResponses, makeEntities, makeEntry, makeHass
+from simulator import LuxSimulator
+
+from custom_components.luxtronikws import coordinator as coordinatorModule
+from custom_components.luxtronikws.coordinator import SNAPSHOT_GROUPS, LuxtronikCoordinator
+from custom_components.luxtronikws.session import getWebsocket
+from custom_components.luxtronikws.snapshot import LuxtronikSnapshot
+
+
+def summary(label: str, values) -> None:
+    values = sorted(values)
+    print(
+        f"{label:<40} p50 {values[len(values) // 2] * 1e3:8.2f} ms,"
+        f" p95 {values[int(len(values) * 0.95)] * 1e3:8.2f} ms,"
+        f" mean {statistics.mean(values) * 1e3:8.2f} ms"
+    )
+
+
+async def benchLogin(count: int) -> None:
+    durations = []
+    for _ in range(count):
+        start = time.perf_counter()
+        ws, _, _, loggedin = await getWebsocket("127.0.0.1", "999999")
+        durations.append(time.perf_counter() - start)
+        assert loggedin, "login to simulator failed"
+        await ws.close()
+    summary("getWebsocket (connect + LOGIN)", durations)
+
+
+async def benchPolls(hass, count: int) -> None:
+    coordinator = LuxtronikCoordinator(hass, makeEntry())
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success, coordinator.last_exception
+
+    start = time.perf_counter()
+    for _ in range(100):
+        coordinator.listEntities()
+    print(f"{'listEntities':<40} {(time.perf_counter() - start) / 100 * 1e6:10.1f} us")
+
+    entities = makeEntities(hass, coordinator)
+    for entity in entities:
+        coordinator.async_add_listener(entity._handle_coordinator_update, entity.coordinator_context)
+    print(f"{len(entities)} entities")
+
+    monitor = LoopLagMonitor()
+    monitor.start()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    durations = []
+    updates = []
+    skipped = 0
+    for _ in range(count):
+        # _async_update_data through async_refresh so the entities are notified,
+        # whatever the refresh takes beyond the poll is the entity update path
+        start = time.perf_counter()
+        await coordinator.async_refresh()
+        durations.append(coordinator.pollDuration)
+        updates.append(time.perf_counter() - start - coordinator.pollDuration)
+        skipped += coordinator.skippedWrites
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    await monitor.stop()
+    await coordinator.async_shutdown()
+
+    summary("coordinator poll", durations)
+    summary("entity updates per poll", updates)
+    print(f"{'skipped entity writes per poll':<40} {skipped / count:10.1f}")
+    stats = after.compare_to(before, "filename")
+    print(
+        f"{'allocations per poll':<40} {sum(stat.count_diff for stat in stats) / count:10.1f} blocks,"
+        f" {sum(stat.size_diff for stat in stats) / count / 1024:8.2f} KiB net"
+    )
+    monitor.report("while polling")
+
+    print("phase timings recorded by the coordinator (ms):")
+    for phase, stats in coordinator.stats.asDict().items():
+        if stats["count"] or stats["failures"]:
+            print(
+                f"  {phase:<38} p50 {stats['p50']:8.1f}, p95 {stats['p95']:8.1f}, max {stats['max']:8.1f},"
+                f" {stats['count']} ok, {stats['failures']} failed"
+            )
+
+
+def benchParse() -> None:
+    responses = loadResponses()
+
+    def decode():
+        snapshot = LuxtronikSnapshot()
+        for group, result in responses.items():
+            snapshot.addReply(group, result, SNAPSHOT_GROUPS.get(group))
+
+    bench("parse all groups", decode)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--processing", type=float, default=0.0)
+    parser.add_argument("--variation", type=float, default=0.2)
+    parser.add_argument("--decode-executor-size", type=int, help="decode polls larger than this in the executor")
+    args = parser.parse_args()
+    if args.decode_executor_size is not None:
+        coordinatorModule.DECODE_EXECUTOR_SIZE = args.decode_executor_size
+
+    benchParse()
+    async with LuxSimulator(
+        latency=args.latency, jitter=args.jitter, processing=args.processing, variation=args.variation, seed=1
+    ):
+        await benchLogin(args.logins)
+        with tempfile.TemporaryDirectory() as configDir:
+            hass = await makeHass(configDir)
+            await benchPolls(hass, args.polls)
+            await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+"""Replay a raw reply recording through the coordinator and the sensors.
+
+Without a recording, one is made first: the coordinator polls the local
+simulator with recording enabled. The recording is then fed back through
+LuxtronikCoordinator with a ReplaySession at the given speed-up (0 runs
+as fast as possible) and parse and entity update cost are reported. The
+script exits with status 1 if ReplaySession does not keep to the
+ControllerSession signatures or a replayed poll fails.
+
+    python benchmarks/bench_replay.py --polls 2000
+    python benchmarks/bench_replay.py /config/luxtronikws/<entry id>.jsonl.gz --speed 600
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from common import GROUPS, makeEntities, makeEntry, makeHass, sessionMismatches
+from simulator import LuxSimulator
+
+from custom_components.luxtronikws.const import DOMAIN
+from custom_components.luxtronikws.coordinator import LuxtronikCoordinator
+from custom_components.luxtronikws.recorder import ReplaySession, readRecording, recordingFiles
+
+
+def summary(label: str, values) -> None:
+    values = sorted(values)
+    print(
+        f"{label:<40} p50 {values[len(values) // 2] * 1e3:8.3f} ms,"
+        f" p95 {values[int(len(values) * 0.95)] * 1e3:8.3f} ms,"
+        f" max {values[-1] * 1e3:8.3f} ms"
+    )
+
+
+async def record(hass, polls: int, maxSize: int) -> str:
+    """Poll the simulator with recording enabled, returns the recording path."""
+    entry = makeEntry(options={"record_raw": True, "record_max_size": maxSize})
+    coordinator = LuxtronikCoordinator(hass, entry)
+    async with LuxSimulator(variation=0.2, seed=1):
+        for number in range(polls):
+            await coordinator.async_refresh()
+            if number == 0:
+                # groups without entities are not fetched after the first poll
+                for entity in makeEntities(hass, coordinator):
+                    coordinator.async_add_listener(entity._handle_coordinator_update, entity.coordinator_context)
+            # let the executor write before the next poll, a real poll
+            # interval leaves plenty of time for it
+            await hass.async_block_till_done()
+    await coordinator.async_shutdown()
+
+    path = hass.config.path(DOMAIN, entry.entry_id+".jsonl.gz")
+    files = recordingFiles(path)
+    size = sum(os.path.getsize(fileName) for fileName in files)
+    print(f"recorded {polls} polls into {len(files)} files, {size / 1024:.1f} KiB compressed")
+    return path
+
+
+async def replay(hass, path: str, speed: float) -> None:
+    session = ReplaySession()
+    # every group on every poll, the session answers with the last recorded reply
+    entry = makeEntry(server="replay", options={"interval_"+group: 0 for group in GROUPS})
+    coordinator = LuxtronikCoordinator(hass, entry, session)
+
+    entities = None
+    parses = []
+    updates = []
+    skipped = 0
+    polls = 0
+    first = previous = None
+    start = time.perf_counter()
+    for timestamp, replies in readRecording(path):
+        if previous is not None and speed > 0:
+            await asyncio.sleep((timestamp - previous) / speed)
+        first = timestamp if first is None else first
+        previous = timestamp
+        session.advance(replies)
+
+        refreshStart = time.perf_counter()
+        await coordinator.async_refresh()
+        if not coordinator.last_update_success:
+            await coordinator.async_shutdown()
+            raise SystemExit(f"replayed poll {polls + 1} failed: {coordinator.last_exception!r}")
+        if entities is None:
+            entities = makeEntities(hass, coordinator)
+            for entity in entities:
+                coordinator.async_add_listener(entity._handle_coordinator_update, entity.coordinator_context)
+            continue
+
+        polls += 1
+        parses.append(coordinator.stats.phase("parse").last)
+        updates.append(time.perf_counter() - refreshStart - coordinator.pollDuration)
+        skipped += coordinator.skippedWrites
+    elapsed = time.perf_counter() - start
+    await coordinator.async_shutdown()
+
+    print(
+        f"replayed {polls} polls covering {(previous - first) / 3600:.2f} h in {elapsed:.2f} s,"
+        f" {len(entities)} entities"
+    )
+    summary("parse", parses)
+    summary("entity updates", updates)
+    print(f"{'skipped entity writes per poll':<40} {skipped / max(polls, 1):10.1f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", nargs="?", help="recording to replay, made from the simulator if not given")
+    parser.add_argument("--polls", type=int, default=500, help="polls to record from the simulator")
+    parser.add_argument("--max-size", type=int, default=1, help="MiB before the recording is rotated")
+    parser.add_argument("--speed", type=float, default=0.0, help="replay speed-up, 0 for as fast as possible")
+    args = parser.parse_args()
+
+    mismatches = sessionMismatches(ReplaySession)
+    if mismatches:
+        print("ReplaySession does not match ControllerSession: "+", ".join(mismatches))
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as configDir:
+        hass = await makeHass(configDir)
+        path = args.recording or await record(hass, args.polls, args.max_size)
+        await replay(hass, path, args.speed)
+        await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+"""State writes avoided by the sensor deadbands and minimum intervals.
+
+A recording (made from the simulator if none is given, see
+bench_replay.py) is replayed twice through the coordinator and the sensor
+entities: once without throttling and once with the given deadband and
+minimum interval for every throttled sensor class. Every state_changed
+event is a row the recorder would write. Time is simulated, polls are
+--interval seconds apart (0 uses the recorded timestamps) and the heartbeat
+timers fire on the simulated clock. The script exits with status 1 if the
+first replayed poll fails.
+
+    python benchmarks/bench_throttle.py --polls 1000 --deadband 0.3 --min-interval 60
+    python benchmarks/bench_throttle.py /config/luxtronikws/<entry id>.jsonl.gz --interval 0 --deadband 2%
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import tempfile
+
+from bench_replay import record
+from common import GROUPS, makeEntities, makeEntry, makeHass
+
+from homeassistant.const import EVENT_STATE_CHANGED
+
+from custom_components.luxtronikws import sensor
+from custom_components.luxtronikws.const import DEFAULT_THROTTLES
+from custom_components.luxtronikws.coordinator import LuxtronikCoordinator
+from custom_components.luxtronikws.recorder import ReplaySession, readRecording
+
+
+class SimulatedClock:
+    """Stands in for time.monotonic and async_call_later of the sensor module."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.timers = []
+        self.order = itertools.count()
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def callLater(self, hass, delay: float, action):
+        timer = [self.now + delay, next(self.order), action]
+        heapq.heappush(self.timers, timer)
+
+        def cancel() -> None:
+            timer[2] = None
+
+        return cancel
+
+    def advance(self, now: float) -> None:
+        """Fire every timer due up to now, in order."""
+        while self.timers and self.timers[0][0] <= now:
+            due, _, action = heapq.heappop(self.timers)
+            self.now = due
+            if action is not None:
+                action(None)
+        self.now = now
+
+
+async def replay(hass, path: str, options: dict, interval: float) -> dict[str, int]:
+    """State writes per sensor class for one replay of the recording."""
+    clock = SimulatedClock()
+    sensor.time.monotonic, monotonic = clock.monotonic, sensor.time.monotonic
+    sensor.async_call_later, callLater = clock.callLater, sensor.async_call_later
+
+    session = ReplaySession()
+    entry = makeEntry(server="replay", options={**{"interval_"+group: 0 for group in GROUPS}, **options})
+    coordinator = LuxtronikCoordinator(hass, entry, session)
+    classes = {}
+    writes = {}
+
+    def count(event) -> None:
+        kind = classes.get(event.data["entity_id"])
+        if kind is not None:
+            writes[kind] = writes.get(kind, 0) + 1
+
+    unsubscribe = hass.bus.async_listen(EVENT_STATE_CHANGED, count)
+    try:
+        entities = None
+        first = None
+        for number, (timestamp, replies) in enumerate(readRecording(path)):
+            first = timestamp if first is None else first
+            clock.advance(timestamp - first if interval == 0 else number * interval)
+            session.advance(replies)
+            await coordinator.async_refresh()
+            if entities is None:
+                if coordinator.data is None:
+                    raise SystemExit(f"the first replayed poll failed, nothing to compare: {coordinator.last_exception!r}")
+                entities = makeEntities(hass, coordinator)
+                for entity in entities:
+                    classes[entity.entity_id] = type(entity).__name__.replace("Luxtronik", "").replace("Entity", "")
+                    coordinator.async_add_listener(entity._handle_coordinator_update, entity.coordinator_context)
+                    entity.async_write_ha_state()
+            await hass.async_block_till_done()
+        # let the last held back values reach their heartbeat
+        clock.advance(clock.now + options.get("heartbeat", 0))
+        await hass.async_block_till_done()
+        writes["throttled"] = coordinator.throttledWrites
+    finally:
+        unsubscribe()
+        for entityId in classes:
+            hass.states.async_remove(entityId)
+        sensor.time.monotonic = monotonic
+        sensor.async_call_later = callLater
+        await coordinator.async_shutdown()
+    return writes
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", nargs="?", help="recording to replay, made from the simulator if not given")
+    parser.add_argument("--polls", type=int, default=500, help="polls to record from the simulator")
+    parser.add_argument("--interval", type=float, default=10, help="simulated seconds between polls, 0 for recorded time")
+    parser.add_argument("--deadband", default="0.3", help="deadband of every throttled class, e.g. 0.3 or 2%%")
+    parser.add_argument("--min-interval", type=int, default=60, help="minimum seconds between writes")
+    parser.add_argument("--heartbeat", type=int, default=900, help="seconds after which held back values are written")
+    args = parser.parse_args()
+
+    options = {"heartbeat": args.heartbeat}
+    for kind in DEFAULT_THROTTLES:
+        options["deadband_"+kind] = args.deadband
+        options["min_interval_"+kind] = args.min_interval
+
+    with tempfile.TemporaryDirectory() as configDir:
+        hass = await makeHass(configDir)
+        path = args.recording or await record(hass, args.polls, 1)
+        plain = await replay(hass, path, {}, args.interval)
+        throttled = await replay(hass, path, options, args.interval)
+        await hass.async_stop(force=True)
+
+    print(f"{'sensor class':<24} {'writes':>8} {'throttled':>10} {'avoided':>8}")
+    for kind in sorted(set(plain) - {"throttled"}):
+        before = plain[kind]
+        after = throttled.get(kind, 0)
+        print(f"{kind:<24} {before:8d} {after:10d} {(before - after) / max(before, 1):8.1%}")
+    before = sum(value for kind, value in plain.items() if kind != "throttled")
+    after = sum(value for kind, value in throttled.items() if kind != "throttled")
+    print(f"{'total':<24} {before:8d} {after:10d} {(before - after) / max(before, 1):8.1%}")
+    print(f"{throttled['throttled']} updates held back")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
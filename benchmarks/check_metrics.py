@@ -0,0 +1,204 @@
+"""Check the derived metrics against a simulated heat pump with a known COP.
+
+The heat pump runs in on/off cycles at a fixed heat output and COP. The
+controller shows the energy counters in 0.1 kWh steps and the compressor
+hours as whole hours, like the real one, and is polled every --interval
+seconds on average. The counters are found by the item names of the
+default profile, behind other items. Halfway through the metrics are
+restored from their stored state.
+
+Once its window is full, every metric has to stay within one step of
+each counter it is derived from of the true value, and its mean over the
+run within 2 %. Cycle rates also have to be a whole number of starts over
+the window, and the COP of the last interval has to be known on most
+polls. Windows longer than the run are not checked. Exits with status 1
+otherwise. Adding a poll is timed.
+
+    python benchmarks/check_metrics.py
+    python benchmarks/check_metrics.py --cop 3.2 --heat 6 --on 1800 --off 2400
+"""
+import argparse
+import json
+import math
+import random
+import sys
+
+from common import bench
+
+from custom_components.luxtronikws.metrics import (
+    COMPRESSOR_HOURS,
+    ELECTRICITY,
+    HEAT,
+    LAST_COP_ELECTRICITY,
+    METRICS,
+    WINDOWS,
+    DerivedMetrics,
+)
+from custom_components.luxtronikws.profiles import DEFAULT_PROFILE, profileIndex
+from custom_components.luxtronikws.snapshot import LuxtronikSnapshot, SnapshotGroup
+
+# step of the energy counters in kWh
+ENERGY_STEP = 0.1
+# allowed relative error of the mean of every metric over the run
+MEAN_TOLERANCE = 0.02
+
+
+# the counters as the profile names them
+COUNTERS = profileIndex(DEFAULT_PROFILE).counters
+# another item ahead of each counter, so they are not at the positions of
+# the fixtures
+OTHER = -1.0
+
+
+def snapshotOf(values: tuple) -> LuxtronikSnapshot:
+    """Snapshot with the counter groups of a poll."""
+    items = {}
+    for (group, name), value in zip(COUNTERS, values):
+        items.setdefault(group, [("Andere", OTHER)]).append((name, value))
+    snapshot = LuxtronikSnapshot()
+    for group, pairs in items.items():
+        snapshot.groups[group] = SnapshotGroup(
+            range(len(pairs)), [name for name, _ in pairs], [str(value) for _, value in pairs],
+            [value for _, value in pairs],
+        )
+    return snapshot
+
+
+def shown(now: float, args) -> tuple:
+    """Counters as the controller shows them after now seconds."""
+    period = args.on + args.off
+    cycles, into = divmod(now, period)
+    running = cycles * args.on + min(into, args.on)
+    heat = running / 3600 * args.heat
+    starts = int(cycles) + 1
+    return (
+        round(math.floor(heat / ENERGY_STEP + 1e-9) * ENERGY_STEP, 1),
+        round(math.floor(heat / args.cop / ENERGY_STEP + 1e-9) * ENERGY_STEP, 1),
+        int(running // 3600),
+        starts,
+    )
+
+
+def tolerance(metric: str, window: str, args) -> float:
+    """Allowed relative error: one counter step of every counter involved.
+
+    Compared to the least the counters can increase by over the shortest
+    span a window covers, so the hour windows, which see few steps, get
+    more room than the longer ones.
+    """
+    period = args.on + args.off
+    if window == "last":
+        electricity = LAST_COP_ELECTRICITY
+        return ENERGY_STEP / (electricity * args.cop) + 0.01
+    length, buckets = WINDOWS[window]
+    seconds = length - length / buckets - 2 * args.interval
+    cycles, rest = divmod(seconds, period)
+    hours = (cycles * args.on + max(rest - args.off, 0)) / 3600
+    heat = hours * args.heat
+    if metric == "cop":
+        return ENERGY_STEP / heat + ENERGY_STEP / (heat / args.cop) + 0.01
+    if metric == "heat_per_compressor_hour":
+        return ENERGY_STEP / heat + 1 / hours + 0.01
+    return period / seconds + 0.01
+
+
+def wholeStarts(value: float, window: str, args) -> bool:
+    """Whether a cycle rate is a whole number of starts over a span the window can cover.
+
+    A span holds between floor and ceil of span / period starts, so the
+    hour windows, whose relative tolerance is a whole cycle, are still
+    held to the rates that can actually come out.
+    """
+    period = args.on + args.off
+    length, buckets = WINDOWS[window]
+    shortest = length - length / buckets - 2 * args.interval
+    longest = length + length / buckets + 2 * args.interval
+    return any(
+        starts * 3600 / longest - 0.01 <= value <= starts * 3600 / shortest + 0.01
+        for starts in range(math.floor(shortest / period), math.ceil(longest / period) + 1)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cop", type=float, default=4.0, help="true COP of the heat pump")
+    parser.add_argument("--heat", type=float, default=8.0, help="heat output in kW while running")
+    parser.add_argument("--on", type=float, default=2400, help="seconds the compressor runs per cycle")
+    parser.add_argument("--off", type=float, default=1300, help="seconds it stands still per cycle")
+    parser.add_argument("--interval", type=float, default=5, help="seconds between polls")
+    parser.add_argument("--days", type=float, default=3, help="simulated days")
+    args = parser.parse_args()
+
+    period = args.on + args.off
+    expected = {
+        "cop": args.cop,
+        "heat_per_compressor_hour": args.heat,
+        "cycles_per_hour": 3600 / period,
+    }
+
+    metrics = DerivedMetrics()
+    polls = int(args.days * 86400 / args.interval)
+    errors = {metric: 0.0 for metric in METRICS}
+    checked = {metric: 0 for metric in METRICS}
+    failures = {metric: 0 for metric in METRICS}
+    sums = {metric: 0.0 for metric in METRICS}
+    known = {metric: 0 for metric in METRICS}
+    # polls are not exactly periodic, which also keeps them from lining up
+    # with the cycles and the window buckets
+    jitter = random.Random(1)
+    now = 0.0
+    for number in range(polls + 1):
+        now += args.interval * jitter.uniform(0.8, 1.2)
+        if number == polls // 2:
+            metrics = DerivedMetrics(**json.loads(json.dumps(metrics.asDict())))
+        metrics.add(now, snapshotOf(shown(now, args)), COUNTERS)
+
+        for metric, window in METRICS:
+            length = WINDOWS[window][0] if window != "last" else period
+            if now < length + period:
+                continue
+            value = metrics.value(metric, window)
+            checked[(metric, window)] += 1
+            if value is None:
+                failures[(metric, window)] += 1
+                continue
+            sums[(metric, window)] += value
+            known[(metric, window)] += 1
+            error = abs(value / expected[metric] - 1)
+            errors[(metric, window)] = max(errors[(metric, window)], error)
+            if error > tolerance(metric, window, args):
+                failures[(metric, window)] += 1
+            elif metric == "cycles_per_hour" and not wholeStarts(value, window, args):
+                failures[(metric, window)] += 1
+
+    ok = True
+    print(f"{polls} polls every {args.interval} s, true COP {args.cop}, {args.heat} kW")
+    for metric in METRICS:
+        allowed = tolerance(*metric, args)
+        # a whole cycle or more: held to whole starts instead
+        shownAllowed = "starts" if allowed >= 1 else f"{allowed:5.0%}"
+        # the last interval may not be known right after a restore
+        limit = checked[metric] // 100 if metric == ("cop", "last") else 0
+        mean = abs(sums[metric] / known[metric] / expected[metric[0]] - 1) if known[metric] else 0.0
+        if not checked[metric]:
+            result = "window not full"
+        elif failures[metric] <= limit and mean <= MEAN_TOLERANCE:
+            result = "ok"
+        else:
+            result = "FAIL"
+            ok = False
+        print(
+            f"  {metric[0]:<26}{metric[1]:<7}{checked[metric]:>8} polls  max error {errors[metric]:6.1%}"
+            f" (allowed {shownAllowed:>6})  mean error {mean:5.1%}  {failures[metric]:>6} off  {result}"
+        )
+
+    final = shown(now, args)
+    print(f"  counters: {final[HEAT]} kWh heat, {final[ELECTRICITY]} kWh electricity, {final[COMPRESSOR_HOURS]} h")
+    times = iter(range(polls + 1, 2**62))
+    snapshot = snapshotOf(final)
+    bench("  add a poll", lambda: metrics.add(next(times) * args.interval, snapshot, COUNTERS))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
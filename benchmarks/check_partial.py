@@ -0,0 +1,92 @@
+"""Check that a poll keeps the groups that answered when one does not.
+
+The coordinator polls the simulator until its page ids are stored, then
+one page is removed from the simulator. Every following poll, by a
+coordinator with the ids just read and by a new one starting from the
+stored ids, has to finish within one GET timeout, mark only that group
+stale and update all other groups. Exits with status 1 otherwise.
+
+    python benchmarks/check_partial.py --group outputs --request-timeout 1
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+
+from common import GROUPS, makeEntry, makeHass
+from simulator import LuxSimulator
+
+from custom_components.luxtronikws import coordinator as coordinatorModule
+from custom_components.luxtronikws.coordinator import LuxtronikCoordinator
+
+
+def listen(coordinator) -> None:
+    """Listen to every group, groups nobody listens to are not polled."""
+    for group in coordinator.data.groups:
+        coordinator.async_add_listener(lambda: None, (group, 0))
+
+
+async def polls(coordinator, group: str, count: int, limit: float) -> bool:
+    ok = True
+    for _ in range(count):
+        previous = coordinator.data
+        start = time.monotonic()
+        await coordinator.async_refresh()
+        duration = time.monotonic() - start
+        updated = sorted(
+            name for name, items in coordinator.data.groups.items() if items is not previous.groups.get(name)
+        )
+        stale = coordinator._attr_stale
+        print(f"  {duration:5.2f} s  stale {sorted(stale)}  updated {updated}")
+        if not coordinator.last_update_success or duration > limit or stale != {group}:
+            ok = False
+        if group in updated or "temperatures" not in updated:
+            ok = False
+    return ok
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--group", default="outputs", help="group whose page stops answering")
+    parser.add_argument("--request-timeout", type=float, default=coordinatorModule.REQUEST_TIMEOUT)
+    parser.add_argument("--polls", type=int, default=3)
+    args = parser.parse_args()
+    coordinatorModule.REQUEST_TIMEOUT = args.request_timeout
+    # a GET timeout plus a login and the decoding
+    limit = args.request_timeout + 0.5
+    options = {"interval_"+group: 0 for group in GROUPS}
+
+    with tempfile.TemporaryDirectory() as configDir:
+        hass = await makeHass(configDir)
+        async with LuxSimulator(variation=1.0, seed=1) as simulator:
+            entry = makeEntry(options=options)
+            first = LuxtronikCoordinator(hass, entry)
+            await first.async_refresh()
+            listen(first)
+            await first.async_refresh()
+            await hass.async_block_till_done()
+            pageId = first.pageId(args.group)
+            page = simulator.pages.pop(pageId)
+
+            print(f"{args.group} ({pageId}) removed, navigation read by this coordinator:")
+            ok = await polls(first, args.group, args.polls, limit)
+            await first.async_shutdown()
+
+            print("new coordinator starting from the stored page ids:")
+            second = LuxtronikCoordinator(hass, entry)
+            # the first poll of a new coordinator has nothing to keep yet
+            simulator.pages[pageId] = page
+            await second.async_refresh()
+            listen(second)
+            simulator.pages.pop(pageId)
+            ok = await polls(second, args.group, args.polls, limit) and ok
+            await second.async_shutdown()
+        await hass.async_stop(force=True)
+
+    print("ok" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
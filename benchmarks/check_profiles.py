@@ -0,0 +1,128 @@
+"""Run every firmware profile against its fixture replies.
+
+Each profile in PROFILE_FIXTURES has a folder with one recorded GET reply
+per group and catalog.json, the entity catalog the profile has to produce
+from them. For every profile the script checks that the Softwarestand of
+the fixtures selects it, that the catalog matches and that every rule
+classifies at least one item, lists the items left without an entity and
+times the classification. The counters of the derived metrics have to
+be numbers in the fixtures. It exits with status 1 on a mismatch.
+
+    python benchmarks/check_profiles.py
+    python benchmarks/check_profiles.py --update   # write catalog.json after a deliberate change
+"""
+import argparse
+import json
+import os
+import sys
+
+from common import FIXTURES, GROUPS, bench
+
+from custom_components.luxtronikws.coordinator import SNAPSHOT_GROUPS, LuxtronikCoordinator
+from custom_components.luxtronikws.metrics import COUNTERS
+from custom_components.luxtronikws.profiles import CATALOG_GROUPS, PROFILES, ProfileIndex, profileIndex, profileName
+from custom_components.luxtronikws.snapshot import LuxtronikSnapshot, ValueDecoder
+
+# fixture folder of each profile
+PROFILE_FIXTURES = {
+    "ait-3.88": FIXTURES,
+}
+
+
+class Catalog:
+    """Just enough of the coordinator to run listEntities on a snapshot."""
+
+    listEntities = LuxtronikCoordinator.listEntities
+
+    def __init__(self, data) -> None:
+        self.data = data
+
+
+def loadSnapshot(folder: str) -> LuxtronikSnapshot:
+    snapshot = LuxtronikSnapshot()
+    decoder = ValueDecoder()
+    for group in GROUPS:
+        with open(os.path.join(folder, group + ".xml"), encoding="utf-8") as file:
+            snapshot.addReply(group, file.read().strip(), SNAPSHOT_GROUPS.get(group), decoder)
+    return snapshot
+
+
+def unusedRules(name: str, snapshot: LuxtronikSnapshot) -> list[dict]:
+    """Rules of a profile that no fixture item falls under."""
+    unused = []
+    for rule in PROFILES[name]["rules"]:
+        single = ProfileIndex({"rules": (rule,)})
+        if not any(
+            single.classify(group, item.name, item.raw) is not None
+            for group in CATALOG_GROUPS
+            for _, item in snapshot.group(group)
+        ):
+            unused.append(rule)
+    return unused
+
+
+def check(name: str, update: bool) -> bool:
+    folder = PROFILE_FIXTURES[name]
+    snapshot = loadSnapshot(folder)
+    print(f"{name} ({os.path.relpath(folder)})")
+    ok = True
+
+    firmware = snapshot.get("deviceinfo", 1).raw
+    if profileName(firmware) != name:
+        print(f"  firmware {firmware} selects {profileName(firmware)}")
+        ok = False
+
+    catalog = Catalog(snapshot).listEntities()
+    for catalogList, entityDicts in catalog.items():
+        print(f"  {catalogList:<16} {len(entityDicts):3d}")
+
+    index = profileIndex(name)
+    for group in CATALOG_GROUPS:
+        for itemIndex, item in snapshot.group(group):
+            if index.classify(group, item.name, item.raw) is None:
+                print(f"  no entity: {group}[{itemIndex}] {item.name} = {item.raw}")
+
+    for rule in unusedRules(name, snapshot):
+        print(f"  rule matches nothing: {rule}")
+        ok = False
+
+    for counter, (group, itemName) in zip(COUNTERS, index.counters or ()):
+        item = snapshot.find(group, itemName)
+        if item is None or not isinstance(item.value, (int, float)):
+            print(f"  counter {counter}: no number at {group} {itemName}")
+            ok = False
+    if index.counters is None:
+        print("  no counters, no derived metrics")
+
+    expectedPath = os.path.join(folder, "catalog.json")
+    if update:
+        with open(expectedPath, "w", encoding="utf-8") as file:
+            json.dump(catalog, file, ensure_ascii=False, indent=1)
+            file.write("\n")
+        print(f"  wrote {os.path.relpath(expectedPath)}")
+    else:
+        with open(expectedPath, encoding="utf-8") as file:
+            expected = json.load(file)
+        for catalogList in sorted(set(expected) | set(catalog)):
+            if expected.get(catalogList) != catalog.get(catalogList):
+                print(f"  {catalogList} differs from catalog.json")
+                ok = False
+
+    bench("  classify", lambda: index.catalog(snapshot, "type", firmware))
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="write the catalogs instead of comparing them")
+    args = parser.parse_args()
+
+    missing = set(PROFILES) - set(PROFILE_FIXTURES)
+    for name in sorted(missing):
+        print(f"{name} has no fixtures")
+    results = [check(name, args.update) for name in PROFILE_FIXTURES]
+    sys.exit(0 if all(results) and not missing else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Shared helpers for the benchmark scripts.
+
+The scripts import the integration, so run them with Home Assistant
+installed, e.g. ``python benchmarks/bench_entity_update.py``.
+"""
+import logging
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+sys.path.insert(0, ROOT)
+
+logging.basicConfig(level=logging.WARNING)
+# entities are driven without an entity platform, which Home Assistant warns about
+logging.getLogger("homeassistant.helpers.entity").setLevel(logging.ERROR)
+
+# groups fetched by the coordinator, one fixture file each
+GROUPS = ["tempSettings", "temperatures", "inputs", "outputs", "times", "hours", "deviceinfo", "energy"]
+
+
+def loadFixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name + ".xml"), encoding="utf-8") as file:
+        return file.read().strip()
+
+
+def loadResponses() -> dict:
+    """Recorded GET replies keyed by group."""
+    return {group: loadFixture(group) for group in GROUPS}
+
+
+def bench(label: str, func, number: int = 2000) -> float:
+    """Run func number times (best of 5) and print the cost per call."""
+    best = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{label:<40} {best * 1e6:10.1f} us")
+    return best
+
+
+class LoopLagMonitor:
+    """Measure how long the event loop is blocked.
+
+    A task sleeps for interval seconds in a loop; everything it wakes up
+    late is time the loop spent running something else without yielding.
+    """
+
+    def __init__(self, interval: float = 0.001) -> None:
+        self.interval = interval
+        self.lags = []
+        self.task = None
+
+    async def run(self) -> None:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(loop.time() - start - self.interval)
+
+    def start(self) -> None:
+        import asyncio
+
+        self.lags = []
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        import asyncio
+
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+    def report(self, label: str) -> None:
+        lags = sorted(self.lags) or [0.0]
+        print(
+            f"{label:<40} loop lag p50 {lags[len(lags) // 2] * 1e3:6.2f} ms,"
+            f" p99 {lags[int(len(lags) * 0.99)] * 1e3:6.2f} ms, max {lags[-1] * 1e3:6.2f} ms"
+        )
+
+
+async def makeHass(configDir: str):
+    """A bare Home Assistant instance, enough to run the coordinator and entities."""
+    from homeassistant.core import HomeAssistant
+
+    hass = HomeAssistant(configDir)
+    await hass.async_start()
+    return hass
+
+
+def makeEntry(server: str = "127.0.0.1", password: str = "999999", updateInterval: int = 1, options=None):
+    import inspect
+
+    from homeassistant.config_entries import ConfigEntry
+
+    from custom_components.luxtronikws.const import DOMAIN
+
+    kwargs = {}
+    # required from Home Assistant 2024.1 on, unknown before
+    if "minor_version" in inspect.signature(ConfigEntry).parameters:
+        kwargs["minor_version"] = 1
+    return ConfigEntry(
+        version=2,
+        domain=DOMAIN,
+        title="Luxtronik WS Integration",
+        data={"server": server, "password": password, "update_interval": updateInterval},
+        source="user",
+        options=options or {},
+        **kwargs,
+    )
+
+
+def makeEntities(hass, coordinator) -> list:
+    """Sensor and binary sensor entities for everything listEntities finds, writing to hass.states."""
+    from custom_components.luxtronikws import binary_sensor, sensor
+
+    classes = {
+        "tempDicts": sensor.LuxtronikTemperatureEntity,
+        "pressureDicts": sensor.LuxtronikPressureEntity,
+        "frequencyDicts": sensor.LuxtronikFrequencyEntity,
+        "percentageDicts": sensor.LuxtronikPercentageEntity,
+        "powerDicts": sensor.LuxtronikPowerEntity,
+        "energyDicts": sensor.LuxtronikEnergyEntity,
+        "timeDicts": sensor.LuxtronikTimeEntity,
+        "stringDicts": sensor.LuxtronikStringEntity,
+        "counterDicts": sensor.LuxtronikCounterEntity,
+        "hourDicts": sensor.LuxtronikHoursEntity,
+        "binaryDicts": lambda entityDict, coordinator, hass: binary_sensor.LuxtronikBinaryEntity(entityDict, coordinator),
+    }
+    entities = []
+    for kind, entityDicts in coordinator.listEntities().items():
+        for entityDict in entityDicts:
+            entity = classes[kind](entityDict, coordinator, hass)
+            entity.hass = hass
+            entity.entity_id = ("binary_sensor" if kind == "binaryDicts" else "sensor")+f".luxtronik_{len(entities)}"
+            entities.append(entity)
+    return entities
+
+
+def sessionMismatches(sessionClass) -> list[str]:
+    """Members of ControllerSession that sessionClass lacks or declares with other parameters."""
+    import inspect
+
+    from custom_components.luxtronikws.session import ControllerSession
+
+    def parameters(function) -> list:
+        return [(p.name, p.kind, p.default) for p in inspect.signature(function).parameters.values()]
+
+    mismatches = [name for name in ControllerSession.__annotations__ if not hasattr(sessionClass, name)]
+    for name, expected in vars(ControllerSession).items():
+        if name.startswith("_"):
+            continue
+        actual = getattr(sessionClass, name, None)
+        if isinstance(expected, property):
+            if not isinstance(actual, property):
+                mismatches.append(name)
+        elif actual is None or parameters(actual) != parameters(expected):
+            mismatches.append(name)
+    return mismatches
@@ -0,0 +1,183 @@
+"""Local stand-in for the Luxtronik websocket server.
+
+Speaks the Lux_WS subprotocol on port 8214: ``LOGIN;password`` answers with
+the recorded Navigation document, ``GET;id`` with the recorded page of that
+id and ``REFRESH`` with the page last requested on the connection. Replies
+come from the files in benchmarks/fixtures.
+
+Replies can be delayed by a fixed latency plus random jitter (which may
+reorder pipelined replies), requests are processed one after the other
+with a configurable processing time, and connections can be dropped at
+random. With variation > 0 numeric values drift between requests so
+change detection sees realistic traffic.
+
+Run it standalone to point a development Home Assistant at it:
+
+    python benchmarks/simulator.py --latency 0.05 --jitter 0.02
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+
+import websockets
+
+from common import FIXTURES
+
+_ROOT_ID = re.compile(r"""\s*<\w+\s+id=["']([^"']+)["']""")
+_NUMBER_VALUE = re.compile(r"<value>(-?\d+\.\d)([^<]*)</value>")
+
+# navigation shown for a wrong password
+WRONG_PASSWORD_NAVIGATION = "<Navigation id='0x1'><item id='0x2'><name>Zugang: Benutzer</name></item></Navigation>"
+
+
+def loadPages(fixtures: str = FIXTURES):
+    """Navigation document and the recorded pages keyed by their id."""
+    pages = {}
+    navigation = None
+    for fileName in sorted(os.listdir(fixtures)):
+        if not fileName.endswith(".xml"):
+            continue
+        with open(os.path.join(fixtures, fileName), encoding="utf-8") as file:
+            content = file.read().strip()
+        if fileName == "navigation.xml":
+            navigation = content
+        else:
+            pages[_ROOT_ID.match(content).group(1)] = content
+    return navigation, pages
+
+
+class LuxSimulator:
+    """Websocket server answering like a Luxtronik controller."""
+
+    def __init__(
+        self,
+        password: str = "999999",
+        host: str = "127.0.0.1",
+        port: int = 8214,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        processing: float = 0.0,
+        dropRate: float = 0.0,
+        variation: float = 0.0,
+        fixtures: str = FIXTURES,
+        seed: int | None = None,
+    ) -> None:
+        self.password = password
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.processing = processing
+        self.dropRate = dropRate
+        self.variation = variation
+        self.navigation, self.pages = loadPages(fixtures)
+        self.random = random.Random(seed)
+        self.server = None
+        self.logins = 0
+        self.requests = 0
+        self.drops = 0
+        self.connections = set()
+
+    async def start(self) -> None:
+        self.server = await websockets.serve(self.handler, self.host, self.port, subprotocols=["Lux_WS"])
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def page(self, pageId: str) -> str | None:
+        content = self.pages.get(pageId)
+        if content is not None and self.variation > 0:
+            content = _NUMBER_VALUE.sub(self.vary, content)
+            self.pages[pageId] = content
+        return content
+
+    def vary(self, match) -> str:
+        value = float(match.group(1))
+        if self.random.random() < self.variation:
+            value += self.random.choice((-0.1, 0.1))
+        return "<value>"+format(value, ".1f")+match.group(2)+"</value>"
+
+    async def reply(self, websocket, message: str) -> None:
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            await websocket.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def handler(self, websocket, path=None) -> None:
+        self.connections.add(websocket)
+        loggedIn = False
+        lastPage = None
+        replies = set()
+        try:
+            async for message in websocket:
+                command, _, argument = message.partition(";")
+                self.requests += 1
+                if self.processing > 0:
+                    await asyncio.sleep(self.processing)
+                if self.dropRate > 0 and self.random.random() < self.dropRate:
+                    self.drops += 1
+                    websocket.transport.abort()
+                    return
+
+                if command == "LOGIN":
+                    self.logins += 1
+                    loggedIn = argument == self.password
+                    response = self.navigation if loggedIn else WRONG_PASSWORD_NAVIGATION
+                elif not loggedIn:
+                    continue
+                elif command == "GET":
+                    lastPage = argument
+                    response = self.page(argument)
+                elif command == "REFRESH" and lastPage is not None:
+                    response = self.page(lastPage)
+                else:
+                    response = None
+
+                # an unknown id is not answered
+                if response is not None:
+                    task = asyncio.create_task(self.reply(websocket, response))
+                    replies.add(task)
+                    task.add_done_callback(replies.discard)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            for task in replies:
+                task.cancel()
+            self.connections.discard(websocket)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8214)
+    parser.add_argument("--password", default="999999")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random seconds added on top of latency")
+    parser.add_argument("--processing", type=float, default=0.0, help="seconds spent on each request, one at a time")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="probability of dropping the connection per request")
+    parser.add_argument("--variation", type=float, default=0.0, help="probability of a value changing per request")
+    args = parser.parse_args()
+
+    simulator = LuxSimulator(
+        args.password, args.host, args.port, args.latency, args.jitter, args.processing, args.drop_rate, args.variation
+    )
+    async with simulator:
+        print(f"Luxtronik simulator listening on {args.host}:{args.port}")
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
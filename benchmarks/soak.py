@@ -0,0 +1,169 @@
+"""Soak test: days worth of polls against the simulator, failing on growth.
+
+The coordinator polls the local simulator back to back with every group
+due on every poll and all sensor entities attached, so --days 1 at the
+minimum 1 s interval is 86,400 polls. The simulator varies values and
+drops connections now and then, so sessions are reopened along the way;
+--subscribe streams the hot groups on their own sessions as well.
+
+Every --sample polls the resident set size, the memory traced by
+tracemalloc, the open sockets of the process (Linux only) and the pending
+asyncio tasks are sampled. After the warm-up the first sample is the
+baseline; the script exits with status 1 if the last sample grew beyond
+the limits, and lists the allocators that grew the most either way.
+
+    python benchmarks/soak.py --days 1
+    python benchmarks/soak.py --days 0.1 --sample 500 --subscribe --drop-rate 0.001
+"""
+import argparse
+import asyncio
+import gc
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import GROUPS, makeEntities, makeEntry, makeHass
+from simulator import LuxSimulator
+
+from custom_components.luxtronikws.const import MIN_SCAN_INTERVAL
+from custom_components.luxtronikws.coordinator import LuxtronikCoordinator
+
+
+def rss() -> int:
+    """Resident set size in bytes, the peak where /proc is not available."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def openSockets() -> int | None:
+    """Sockets open in this process, the simulator's side included."""
+    try:
+        names = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    count = 0
+    for name in names:
+        try:
+            count += os.readlink("/proc/self/fd/" + name).startswith("socket:")
+        except OSError:
+            pass
+    return count
+
+
+def sample() -> dict:
+    gc.collect()
+    return {
+        "rss": rss(),
+        "traced": tracemalloc.get_traced_memory()[0],
+        "sockets": openSockets(),
+        "tasks": len(asyncio.all_tasks()),
+    }
+
+
+def printSample(polls: int, values: dict, elapsed: float) -> None:
+    sockets = "-" if values["sockets"] is None else values["sockets"]
+    print(
+        f"{polls:>9} polls {elapsed:8.0f} s  rss {values['rss'] / 2**20:8.1f} MiB"
+        f"  traced {values['traced'] / 1024:9.1f} KiB  sockets {sockets:>4}  tasks {values['tasks']:>4}"
+    )
+
+
+async def soak(hass, args) -> bool:
+    polls = round(args.days * 86400 / args.interval)
+    options = {"interval_"+group: 0 for group in GROUPS}
+    if args.subscribe:
+        options.update({"subscribe": True, "subscribe_interval": args.interval})
+    coordinator = LuxtronikCoordinator(hass, makeEntry(options=options))
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success, coordinator.last_exception
+    entities = makeEntities(hass, coordinator)
+    for entity in entities:
+        coordinator.async_add_listener(entity._handle_coordinator_update, entity.coordinator_context)
+    print(f"{polls} polls ({args.days} days at {args.interval} s), {len(entities)} entities")
+
+    start = time.monotonic()
+    baseline = None
+    baselineTrace = None
+    failures = 0
+    try:
+        for number in range(1, polls + 1):
+            await coordinator.async_refresh()
+            failures += not coordinator.last_update_success
+            if args.subscribe:
+                # let the subscriptions stream between polls
+                await asyncio.sleep(0)
+            if number == args.warmup:
+                baseline = sample()
+                baselineTrace = tracemalloc.take_snapshot()
+                printSample(number, baseline, time.monotonic() - start)
+            elif number % args.sample == 0 or number == polls:
+                printSample(number, sample(), time.monotonic() - start)
+        last = sample()
+        lastTrace = tracemalloc.take_snapshot()
+    finally:
+        await coordinator.async_shutdown()
+    print(f"{failures} failed polls, {coordinator.stats.phase('poll').count} successful")
+
+    if baseline is None:
+        print("fewer polls than the warm-up, nothing to compare")
+        return True
+
+    print("allocators that grew the most since the warm-up:")
+    for stat in lastTrace.compare_to(baselineTrace, "lineno")[:args.top]:
+        print(f"  {stat.size_diff / 1024:+9.1f} KiB {stat.count_diff:+7d} blocks  {stat.traceback}")
+
+    limits = {
+        "rss": args.max_rss * 2**20,
+        "traced": args.max_traced * 1024,
+        "sockets": args.max_sockets,
+        "tasks": args.max_tasks,
+    }
+    ok = True
+    for name, limit in limits.items():
+        if last[name] is None:
+            continue
+        growth = last[name] - baseline[name]
+        if growth > limit:
+            print(f"FAIL {name} grew by {growth}, limit {limit}")
+            ok = False
+    if ok:
+        print("no growth beyond the limits")
+    return ok
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=float, default=1.0, help="simulated days of polling")
+    parser.add_argument("--interval", type=float, default=MIN_SCAN_INTERVAL, help="simulated seconds per poll")
+    parser.add_argument("--warmup", type=int, default=1000, help="polls before the baseline sample")
+    parser.add_argument("--sample", type=int, default=5000, help="polls between samples")
+    parser.add_argument("--top", type=int, default=10, help="allocators to list")
+    parser.add_argument("--variation", type=float, default=0.2, help="probability of a value changing per request")
+    parser.add_argument("--drop-rate", type=float, default=0.0005, help="probability of a dropped connection per request")
+    parser.add_argument("--subscribe", action="store_true", help="stream the hot groups as well")
+    parser.add_argument("--max-rss", type=float, default=16, help="allowed RSS growth in MiB")
+    parser.add_argument("--max-traced", type=float, default=256, help="allowed traced memory growth in KiB")
+    parser.add_argument("--max-sockets", type=int, default=2, help="allowed growth of open sockets")
+    parser.add_argument("--max-tasks", type=int, default=2, help="allowed growth of pending tasks")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as configDir:
+        hass = await makeHass(configDir)
+        async with LuxSimulator(variation=args.variation, dropRate=args.drop_rate, seed=1) as simulator:
+            ok = await soak(hass, args)
+            print(f"simulator: {simulator.logins} logins, {simulator.requests} requests, {simulator.drops} drops")
+        await hass.async_stop(force=True)
+    tracemalloc.stop()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
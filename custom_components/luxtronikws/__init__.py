@@ -1,16 +1,21 @@
 """The Luxtronik WS integration."""
 from __future__ import annotations
 
+import inspect
 import logging
 
-from homeassistant.config_entries import ConfigEntry
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.storage import Store
 
-from .const import DOMAIN
+from .const import DOMAIN, STORAGE_VERSION
+from .coordinator import LuxtronikCoordinator, catalogStoreKey, metricsStoreKey, navigationStoreKey
+from .lux_ip import getDiscovery
+from .scheduler import getScheduler
 
-# For your initial PR, limit it to 1 platform.
-PLATFORMS: list[Platform] = [Platform.SENSOR]
+PLATFORMS: list[Platform] = [Platform.SENSOR, Platform.BINARY_SENSOR]
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,12 +23,87 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Luxtronik WS from a config entry."""
     _LOGGER.info("async setup entry called, title:" + entry.title)
     hass.data.setdefault(DOMAIN, {})
+    # keep looking for controllers, in case one gets a new address
+    getDiscovery(hass).async_start()
+
+    # one coordinator per controller, all platforms share its polls
+    coordinator = LuxtronikCoordinator(hass, entry)
+    catalog = await coordinator.async_load_catalog()
+    if catalog is None:
+        # first start, the entities can only be listed from a poll
+        await coordinator.async_config_entry_first_refresh()
+        await coordinator.async_save_catalog(coordinator.listEntities())
+    else:
+        # entities start from the stored catalog with their restored state,
+        # the first poll checks the catalog against the controller
+        entry.async_on_unload(coordinator.async_watch_catalog())
+    hass.data[DOMAIN][entry.entry_id] = coordinator
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(
+        getScheduler(hass).async_add(coordinator, refreshNow=coordinator.data is None)
+    )
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
     return True
 
 
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Move a config entry of an older version to the current one."""
+    _LOGGER.info("migrating config entry "+entry.title+" from version "+str(entry.version))
+    if entry.version == 1:
+        # unique ids and the device were per model, so two controllers of
+        # the same model collided; both are per config entry now
+        prefix = entry.entry_id+"_"
+
+        @callback
+        def migrateEntity(registryEntry: er.RegistryEntry) -> dict | None:
+            if registryEntry.unique_id.startswith(prefix):
+                return None
+            return {"new_unique_id": prefix+registryEntry.unique_id}
+
+        await er.async_migrate_entries(hass, entry.entry_id, migrateEntity)
+
+        devices = dr.async_get(hass)
+        for device in dr.async_entries_for_config_entry(devices, entry.entry_id):
+            if device.config_entries == {entry.entry_id}:
+                devices.async_update_device(device.id, new_identifiers={(DOMAIN, entry.entry_id)})
+            else:
+                # shared with another controller of the same model, which
+                # keeps it; this one gets its own device on setup
+                devices.async_update_device(device.id, remove_config_entry_id=entry.entry_id)
+
+        if "version" in inspect.signature(hass.config_entries.async_update_entry).parameters:
+            hass.config_entries.async_update_entry(entry, version=2)
+        else:
+            # Home Assistant before 2024.3
+            entry.version = 2
+            hass.config_entries.async_update_entry(entry)
+    return entry.version == 2
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     _LOGGER.info("async unload entry called, title:" + entry.title)
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    loaded = [
+        other for other in hass.config_entries.async_entries(DOMAIN)
+        if other.entry_id != entry.entry_id and other.state is ConfigEntryState.LOADED
+    ]
+    if not loaded:
+        getDiscovery(hass).async_stop()
+    unloaded = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unloaded:
+        hass.data[DOMAIN].pop(entry.entry_id, None)
+    return unloaded
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the data stored for a config entry."""
+    await Store(hass, STORAGE_VERSION, navigationStoreKey(entry.entry_id)).async_remove()
+    await Store(hass, STORAGE_VERSION, catalogStoreKey(entry.entry_id)).async_remove()
+    await Store(hass, STORAGE_VERSION, metricsStoreKey(entry.entry_id)).async_remove()
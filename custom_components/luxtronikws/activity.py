@@ -0,0 +1,42 @@
+"""Tell from the outputs and the operating state whether the heat pump is working."""
+from __future__ import annotations
+
+# on/off outputs, German and English web interface
+ON_VALUES = ("Ein", "On")
+OFF_VALUES = ("Aus", "Off")
+COMPRESSOR_PREFIXES = ("VD", "Compressor")
+DEFROST_OUTPUTS = ("AV-Abtauventil", "AV-Defrost valve", "Defrost valve")
+FREQUENCY_OUTPUTS = ("Verdichterfrequenz", "Compressor frequency")
+
+# deviceinfo item holding the operating state and the states of an idle unit
+STATE_NAMES = ("Betriebszustand", "Operating state", "Operation mode")
+IDLE_STATES = ("Keine Anforderung", "No request", "Bereitschaft", "Standby", "EVU", "Utility lock")
+
+
+def activity(snapshot) -> tuple[bool, tuple]:
+    """Whether the unit is running and the states that decision is based on.
+
+    Running means a compressor or the defrost valve is on, the compressor
+    frequency is above zero or the operating state is not an idle one.
+    The states are returned so a caller can notice a unit starting or
+    stopping between two polls.
+    """
+    states = []
+    running = False
+    for _, item in snapshot.group("outputs"):
+        if item.name in FREQUENCY_OUTPUTS:
+            on = isinstance(item.value, (int, float)) and item.value > 0
+        elif item.name.startswith(COMPRESSOR_PREFIXES) or item.name in DEFROST_OUTPUTS:
+            on = item.raw in ON_VALUES
+        else:
+            continue
+        states.append(on)
+        running = running or on
+
+    for _, item in snapshot.group("deviceinfo"):
+        if item.name in STATE_NAMES:
+            states.append(item.raw)
+            running = running or item.raw not in IDLE_STATES
+            break
+
+    return running, tuple(states)
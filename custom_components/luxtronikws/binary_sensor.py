@@ -0,0 +1,51 @@
+"""Platform for binary sensor integration."""
+from __future__ import annotations
+
+import logging
+
+from homeassistant.components.binary_sensor import BinarySensorEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import STATE_OFF, STATE_ON
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
+
+from .activity import OFF_VALUES, ON_VALUES
+from .entity import LuxtronikCoordinatorEntity, removeEntities, uniqueId
+
+from .const import (
+    DOMAIN,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    _LOGGER.info("binary sensor async setup entry called, title:" + config_entry.title)
+
+    localCoordinator = hass.data[DOMAIN][config_entry.entry_id]
+    # a catalog stored by an older version has no binaryDicts, the first
+    # poll replaces it and reloads the entry
+    binaryDicts = localCoordinator.catalog.get("binaryDicts", [])
+    # older versions made sensors of these, under the same unique ids
+    removeEntities(hass, "sensor", [uniqueId(config_entry.entry_id, dict) for dict in binaryDicts])
+    async_add_entities(LuxtronikBinaryEntity(dict, localCoordinator) for dict in binaryDicts)
+
+
+class LuxtronikBinaryEntity(RestoreEntity, BinarySensorEntity, LuxtronikCoordinatorEntity):
+    """On/off input or output of the controller"""
+
+    def updateValue(self) -> None:
+        """On or off, unknown if the controller shows anything else."""
+        item = self.item()
+        raw = item.raw if item is not None else None
+        self._attr_is_on = True if raw in ON_VALUES else False if raw in OFF_VALUES else None
+
+    async def restoreValue(self) -> None:
+        restored = await self.async_get_last_state()
+        if restored is not None and restored.state in (STATE_ON, STATE_OFF):
+            self._attr_is_on = restored.state == STATE_ON
@@ -8,53 +8,44 @@ from typing import Any
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 
-from .const import DOMAIN, DEFAULT_SCAN_INTERVAL, MIN_SCAN_INTERVAL
-from .lux_ip import getLuxIp
-import websockets
-import xml.etree.ElementTree as ET
+from .const import (
+    DOMAIN,
+    DEFAULT_ADAPTIVE_MAX,
+    DEFAULT_ADAPTIVE_MIN,
+    DEFAULT_GROUP_INTERVALS,
+    DEFAULT_HEARTBEAT,
+    DEFAULT_RECORDER_SIZE,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SUBSCRIBE_INTERVAL,
+    DEFAULT_THROTTLES,
+    MIN_SCAN_INTERVAL,
+    PENDING_SESSIONS,
+)
+from .lux_ip import getDiscovery
+from .session import LuxtronikSession, getWebsocket
+from .throttle import parseDeadband
 
 _LOGGER = logging.getLogger(__name__)
 
-async def getWebsocket(server, password: str):
-    try:
-        websocket = await websockets.connect("ws://"+server+":8214/", subprotocols=["Lux_WS"])
-        await websocket.send("LOGIN;"+password)
-        try:
-            result = await websocket.recv()
-            if not result.startswith("<Navigation id="):
-                _LOGGER.critical("luxtronik login response is unknown")
-                return None, None, True, False
-
-            root = ET.fromstring(result)
-            if len(root) < 5:
-                _LOGGER.critical("wrong password")
-                return None, None, True, False
-
-        except websockets.exceptions.ConnectionClosedError:
-            _LOGGER.critical("Connection closed unexpectedly.")
-            return None, None, True, False
-
-        _LOGGER.debug("Websocket returned:"+result)
-        return websocket, root, True, True
-    except OSError:
-        _LOGGER.critical("Couldn't connect to websocket")
-        return None, None, False, False
-
-    return
-
 class PlaceholderHub:
     def __init__(self, server: str) -> None:
         """Initialize."""
         self.server = server
+        self.websocket = None
+        self.root = None
 
     async def authenticate(self, password: str) -> (bool, bool):
-        """Test if we can authenticate with the host."""
-        ws, _, connected, loggedin = await getWebsocket(self.server, password)
-        await ws.close()
+        """Test if we can authenticate with the host.
+
+        The logged-in socket is kept so the coordinator can adopt it.
+        """
+        ws, root, connected, loggedin = await getWebsocket(self.server, password)
+        self.websocket = ws
+        self.root = root
         return connected, loggedin
 
 
@@ -73,6 +64,11 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
         raise InvalidAuth
 
     _LOGGER.debug("Authentication ok, connected:"+str(connected)+ " loggedin:"+str(loggedin))
+    # Hand the open session over to the coordinator created by the entry setup.
+    pending = hass.data.setdefault(DOMAIN, {}).setdefault(PENDING_SESSIONS, {})
+    if data["server"] in pending:
+        await pending.pop(data["server"]).async_close()
+    pending[data["server"]] = LuxtronikSession(data["server"], data["password"], hub.websocket, hub.root)
     # Return info that you want to store in the config entry.
     return {
         "title": "Luxtronik WS Integration",
@@ -84,7 +80,7 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Luxtronik WS."""
 
-    VERSION = 1
+    VERSION = 2
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
@@ -104,7 +100,10 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             else:
                 return self.async_create_entry(title=info["title"], data=user_input)
 
-        luxIp = await getLuxIp()
+        discovery = getDiscovery(self.hass)
+        controllers = discovery.controllers or await discovery.async_scan()
+        configured = {entry.data["server"] for entry in self._async_current_entries()}
+        luxIp = next((server for server in controllers if server not in configured), "static.luxtronik.ip.here")
 
         dataSchema = vol.Schema(
             {
@@ -118,9 +117,105 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
         return self.async_show_form(
-            step_id="user", data_schema=dataSchema, errors=errors
+            step_id="user",
+            data_schema=dataSchema,
+            errors=errors,
+            description_placeholders={"controllers": ", ".join(controllers) or "-"},
+        )
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        """Create the options flow."""
+        return OptionsFlowHandler(config_entry)
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle Luxtronik WS options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage adaptive polling, streaming, recording, the per-group polling intervals and write throttling."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            if user_input["adaptive_min"] > user_input["adaptive_max"]:
+                errors["base"] = "invalid_bounds"
+            for kind in DEFAULT_THROTTLES:
+                try:
+                    parseDeadband(user_input["deadband_"+kind])
+                except ValueError:
+                    errors["deadband_"+kind] = "invalid_deadband"
+            if not errors:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        dataSchema = vol.Schema(
+            {
+                vol.Required(
+                    "adaptive_polling",
+                    default=options.get("adaptive_polling", False),
+                ): bool,
+                vol.Required(
+                    "adaptive_min",
+                    default=options.get("adaptive_min", DEFAULT_ADAPTIVE_MIN),
+                ): vol.All(vol.Coerce(int), vol.Range(min=MIN_SCAN_INTERVAL, max=3600)),
+                vol.Required(
+                    "adaptive_max",
+                    default=options.get("adaptive_max", DEFAULT_ADAPTIVE_MAX),
+                ): vol.All(vol.Coerce(int), vol.Range(min=MIN_SCAN_INTERVAL, max=3600)),
+                vol.Required(
+                    "subscribe",
+                    default=options.get("subscribe", False),
+                ): bool,
+                vol.Required(
+                    "subscribe_interval",
+                    default=options.get("subscribe_interval", DEFAULT_SUBSCRIBE_INTERVAL),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0.2, max=60)),
+                vol.Required(
+                    "record_raw",
+                    default=options.get("record_raw", False),
+                ): bool,
+                vol.Required(
+                    "record_max_size",
+                    default=options.get("record_max_size", DEFAULT_RECORDER_SIZE),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1000)),
+                **{
+                    vol.Required(
+                        "interval_"+group,
+                        default=options.get("interval_"+group, default),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=86400))
+                    for group, default in DEFAULT_GROUP_INTERVALS.items()
+                },
+                **{
+                    vol.Required(
+                        "deadband_"+kind,
+                        default=options.get("deadband_"+kind, deadband),
+                    ): str
+                    for kind, (deadband, _) in DEFAULT_THROTTLES.items()
+                },
+                **{
+                    vol.Required(
+                        "min_interval_"+kind,
+                        default=options.get("min_interval_"+kind, minInterval),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=86400))
+                    for kind, (_, minInterval) in DEFAULT_THROTTLES.items()
+                },
+                vol.Required(
+                    "heartbeat",
+                    default=options.get("heartbeat", DEFAULT_HEARTBEAT),
+                ): vol.All(vol.Coerce(int), vol.Range(min=MIN_SCAN_INTERVAL, max=86400)),
+            }
         )
 
+        return self.async_show_form(step_id="init", data_schema=dataSchema, errors=errors)
+
 
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
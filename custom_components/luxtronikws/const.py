@@ -1,5 +1,71 @@
 """Constants for the Luxtronik WS integration."""
+from datetime import timedelta
 
 DOMAIN = "luxtronikws"
 MIN_SCAN_INTERVAL = 1
 DEFAULT_SCAN_INTERVAL = 30
+KEEPALIVE_INTERVAL = 20
+KEEPALIVE_TIMEOUT = 20
+PENDING_SESSIONS = "pending_sessions"
+REQUEST_TIMEOUT = 5
+# seconds a whole poll may take, of which POLL_RESERVE are kept back from
+# the GETs for decoding and storing the replies
+POLL_TIMEOUT = 10
+POLL_RESERVE = 1
+STORAGE_VERSION = 1
+SCHEDULER = "scheduler"
+MAX_CONCURRENT_FETCHES = 2
+
+# seconds between fetches of each GET group, 0 fetches it on every poll
+DEFAULT_GROUP_INTERVALS = {
+    "temperatures": 0,
+    "inputs": 0,
+    "outputs": 0,
+    "times": 0,
+    "deviceinfo": 0,
+    "tempSettings": 300,
+    "hours": 300,
+    "energy": 300,
+}
+DISCOVERY = "discovery"
+# seconds to collect answers to a discovery broadcast
+DISCOVERY_WINDOW = 1.0
+DISCOVERY_INTERVAL = timedelta(minutes=10)
+# polls kept for the rolling phase statistics
+STATS_WINDOW = 100
+# bounds of the poll interval in adaptive mode, in seconds
+DEFAULT_ADAPTIVE_MIN = 10
+DEFAULT_ADAPTIVE_MAX = 300
+# raw reply recording, size in MiB at which the file is rotated
+DEFAULT_RECORDER_SIZE = 10
+RECORDER_BACKUPS = 3
+# failed polls in a row that open the circuit breaker, and its pause in
+# seconds, doubled on every failed probe up to the maximum
+BREAKER_THRESHOLD = 3
+BREAKER_BACKOFF = 30
+BREAKER_MAX_BACKOFF = 900
+
+# seconds the metric windows are kept in memory before they are stored
+METRICS_SAVE_DELAY = 60
+
+# sensor classes whose state writes can be throttled, with the default
+# deadband ("0.2" in the unit of the value, "5%" of the last published
+# value) and minimum seconds between writes; 0 writes every change
+DEFAULT_THROTTLES = {
+    "temperature": ("0", 0),
+    "pressure": ("0", 0),
+    "frequency": ("0", 0),
+    "percentage": ("0", 0),
+    "power": ("0", 0),
+}
+# seconds after which a held back value is written anyway
+DEFAULT_HEARTBEAT = 900
+
+# groups a subscription keeps a session parked on, refreshed every
+# DEFAULT_SUBSCRIBE_INTERVAL seconds unless configured otherwise
+SUBSCRIBED_GROUPS = ("temperatures", "outputs")
+DEFAULT_SUBSCRIBE_INTERVAL = 1.0
+
+# replies of one poll larger than this (characters) are decoded in the
+# executor instead of on the event loop
+DECODE_EXECUTOR_SIZE = 16384
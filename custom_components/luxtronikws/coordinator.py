@@ -1,174 +1,843 @@
-from .config_flow import getWebsocket
+from .activity import activity
+from .const import (
+    BREAKER_BACKOFF,
+    BREAKER_MAX_BACKOFF,
+    BREAKER_THRESHOLD,
+    DEFAULT_ADAPTIVE_MAX,
+    DEFAULT_ADAPTIVE_MIN,
+    DEFAULT_GROUP_INTERVALS,
+    DEFAULT_HEARTBEAT,
+    DEFAULT_RECORDER_SIZE,
+    DEFAULT_SUBSCRIBE_INTERVAL,
+    DEFAULT_THROTTLES,
+    DECODE_EXECUTOR_SIZE,
+    DISCOVERY_INTERVAL,
+    DOMAIN,
+    METRICS_SAVE_DELAY,
+    PENDING_SESSIONS,
+    POLL_RESERVE,
+    POLL_TIMEOUT,
+    REQUEST_TIMEOUT,
+    STORAGE_VERSION,
+    SUBSCRIBED_GROUPS,
+)
+from .lux_ip import getDiscovery
+from .metrics import DerivedMetrics
+from .navigation import GROUP_POSITIONS, buildNavigationIndex
+from .profiles import ProfileIndex, profileIndex, profileName
+from .recorder import LuxtronikRecorder
+from .scheduler import getScheduler
+from .session import ControllerSession, ControllerUnreachable, LuxtronikSession, getWebsocket
+from .snapshot import LuxtronikSnapshot, ValueDecoder
+from .stats import LoopTimer, PollStats
+from .subscription import LuxtronikSubscription
+from .throttle import PublishThrottle
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
+    UpdateFailed,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.storage import Store
 from datetime import timedelta
+import asyncio
 import async_timeout
 import logging
-import xml.etree.ElementTree as ET
+import time
+import websockets
 
 _LOGGER = logging.getLogger(__name__)
 
+# snapshot groups filled from the reply of a GET group
+SNAPSHOT_GROUPS = {
+    "energy": ("energyOutputs", "energyInputs"),
+}
+# GET group each snapshot group is fetched with
+FETCH_GROUPS = {
+    snapshotGroup: group for group, snapshotGroups in SNAPSHOT_GROUPS.items() for snapshotGroup in snapshotGroups
+}
+# GET groups the values of entities outside the snapshot are derived from
+DERIVED_GROUPS = {
+    "metrics": ("energy", "hours"),
+}
+
+
+def listenerGroups(context) -> tuple[str, ...]:
+    """GET groups a listener with a (group, index) context needs."""
+    group = context[0]
+    return DERIVED_GROUPS.get(group, (FETCH_GROUPS.get(group, group),))
+
+
+def navigationStoreKey(entryId: str) -> str:
+    return DOMAIN+"."+entryId+".navigation"
+
+
+def catalogStoreKey(entryId: str) -> str:
+    return DOMAIN+"."+entryId+".catalog"
+
+
+def metricsStoreKey(entryId: str) -> str:
+    return DOMAIN+"."+entryId+".metrics"
+
 
 class LuxtronikCoordinator(DataUpdateCoordinator):
     """Luxtronik custom coordinator."""
 
-    def __init__(self, hass: HomeAssistant, server, password, update_interval) -> None:
-        """Initialize my coordinator."""
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, session: ControllerSession | None = None) -> None:
+        """Initialize my coordinator.
+
+        session replaces the controller session, e.g. with a ReplaySession.
+        """
+        server = entry.data["server"]
+        password = entry.data["password"]
+        update_interval = entry.data["update_interval"]
         super().__init__(
             hass,
             _LOGGER,
             # Name of the data. For logging purposes.
-            name="LuxtronikCoordinator",
-            # Polling interval. Will only be polled if there are subscribers.
-            update_interval=timedelta(seconds=update_interval),
+            name="LuxtronikCoordinator "+server,
+            # Polls are started by the integration-wide LuxtronikScheduler,
+            # so the coordinator does not schedule refreshes itself.
+            update_interval=None,
         )
+        self._attr_poll_interval = timedelta(seconds=update_interval)
+        self._attr_entry = entry
         self._attr_server = server
         self._attr_password = password
+        self._attr_relocated = None
+        if session is None:
+            # adopt the socket opened by the config flow, if there is one
+            session = hass.data.get(DOMAIN, {}).get(PENDING_SESSIONS, {}).pop(server, None)
+        if session is None:
+            session = LuxtronikSession(server, password)
+        self._attr_session: ControllerSession = session
+        self._attr_poll_duration = None
+        # monotonic time the running poll has to be done by, and the GET
+        # replies it received so far
+        self._attr_poll_deadline = None
+        self._attr_received = None
+        self._attr_stats = PollStats()
+        session.stats = self._attr_stats
+        self._attr_group_intervals = {
+            group: entry.options.get("interval_"+group, default)
+            for group, default in DEFAULT_GROUP_INTERVALS.items()
+        }
+        # adaptive mode moves the poll interval between these bounds
+        self._attr_adaptive = entry.options.get("adaptive_polling", False)
+        self._attr_min_interval = timedelta(seconds=entry.options.get("adaptive_min", DEFAULT_ADAPTIVE_MIN))
+        self._attr_max_interval = timedelta(seconds=entry.options.get("adaptive_max", DEFAULT_ADAPTIVE_MAX))
+        self._attr_activity = None
+        self._attr_recorder = None
+        if entry.options.get("record_raw", False):
+            self._attr_recorder = LuxtronikRecorder(
+                hass,
+                hass.config.path(DOMAIN, entry.entry_id+".jsonl.gz"),
+                entry.options.get("record_max_size", DEFAULT_RECORDER_SIZE) * 1024 * 1024,
+            )
+        # value parsers compiled from the first reply of each group
+        self._attr_decoder = ValueDecoder()
+        # monotonic time each GET group was last fetched
+        self._attr_last_fetch: dict[str, float] = {}
+        # GET groups showing the values of an earlier poll because their
+        # last fetch failed
+        self._attr_stale: set[str] = set()
+        # circuit breaker: failed polls in a row, times it opened and the
+        # monotonic time until which it stays open
+        self._attr_failures = 0
+        self._attr_trips = 0
+        self._attr_breaker_until = None
+        # page id of each group and the firmware it was read from; ids
+        # loaded from storage are unconfirmed until the controller answers
+        # them or the navigation is read again
+        self._attr_navigation = None
+        self._attr_navigation_stored = False
+        self._attr_navigation_store = Store(hass, STORAGE_VERSION, navigationStoreKey(entry.entry_id))
+        self._attr_navigation_loaded = False
+        # entity dicts of listEntities, as stored at the last setup
+        self._attr_catalog = None
+        self._attr_catalog_store = Store(hass, STORAGE_VERSION, catalogStoreKey(entry.entry_id))
+        # rolling windows of the energy and compressor counters, kept
+        # across restarts
+        self._attr_metrics = DerivedMetrics()
+        self._attr_metrics_store = Store(hass, STORAGE_VERSION, metricsStoreKey(entry.entry_id))
+        self._attr_metrics_loaded = False
+        # firmware and profile of the controller, as of the last poll
+        self._attr_profile = None
+        # entity callbacks keyed by the (group, index) they display
+        self._attr_listener_index: dict[tuple[str, int], list[CALLBACK_TYPE]] = {}
+        # listeners per GET group, groups without any are not fetched; idle
+        # are the groups the last poll skipped for that reason
+        self._attr_group_listeners: dict[str, int] = {}
+        self._attr_idle: set[str] = set()
+        # keys changed by the last poll, None notifies every listener
+        self._attr_changed_keys = None
+        self._attr_notified_success = None
+        self._attr_skipped_writes = 0
+        self._attr_total_skipped_writes = 0
+        # state write throttles of the sensor classes, None writes every change
+        heartbeat = entry.options.get("heartbeat", DEFAULT_HEARTBEAT)
+        self._attr_throttles = {
+            kind: PublishThrottle.fromOptions(
+                entry.options.get("deadband_"+kind, deadband),
+                entry.options.get("min_interval_"+kind, minInterval),
+                heartbeat,
+            )
+            for kind, (deadband, minInterval) in DEFAULT_THROTTLES.items()
+        }
+        self._attr_throttled_writes = 0
+        # sessions parked on the hot groups, streaming them with REFRESH
+        self._attr_subscriptions = {}
+        if entry.options.get("subscribe", False):
+            interval = entry.options.get("subscribe_interval", DEFAULT_SUBSCRIBE_INTERVAL)
+            self._attr_subscriptions = {
+                group: LuxtronikSubscription(
+                    server, password, group, lambda group=group: self.pageId(group),
+                    interval, self.streamed, self._attr_stats,
+                )
+                for group in SUBSCRIBED_GROUPS
+            }
 
-    async def _ainit(self) -> None:
-        ws, root, _, _ = await getWebsocket(self._attr_server, self._attr_password)
-        self._attr_ws = ws
-        self._attr_root = root
+    @property
+    def server(self) -> str:
+        return self._attr_server
+
+    @property
+    def entryId(self) -> str:
+        return self._attr_entry.entry_id
+
+    @property
+    def pollInterval(self) -> timedelta:
+        """Time between polls, used by the scheduler."""
+        return self._attr_poll_interval
+
+    @property
+    def hasListeners(self) -> bool:
+        return bool(self._listeners)
+
+    @property
+    def pollDuration(self) -> float | None:
+        """Wall-clock seconds taken by the last poll."""
+        return self._attr_poll_duration
+
+    @property
+    def breakerState(self) -> str:
+        """closed while polling normally, open while paused, half-open when a probe is due."""
+        if self._attr_breaker_until is None:
+            return "closed"
+        return "open" if time.monotonic() < self._attr_breaker_until else "half-open"
+
+    @property
+    def groupIntervals(self) -> dict[str, float]:
+        """Seconds between polls of each GET group."""
+        return dict(self._attr_group_intervals)
+
+    @property
+    def lastFetch(self) -> dict[str, float]:
+        """Monotonic time each GET group was last fetched."""
+        return dict(self._attr_last_fetch)
+
+    @property
+    def staleGroups(self) -> set[str]:
+        """GET groups the last poll did not get a reply for."""
+        return set(self._attr_stale)
+
+    @property
+    def failures(self) -> int:
+        """Polls failed in a row."""
+        return self._attr_failures
+
+    @property
+    def navigation(self):
+        """Firmware and page ids of the navigation, None until it is loaded or built."""
+        return self._attr_navigation
+
+    def staleAge(self, group: str) -> float | None:
+        """Seconds since a snapshot group was last fetched if it is stale, else None."""
+        fetchGroup = FETCH_GROUPS.get(group, group)
+        if fetchGroup not in self._attr_stale or fetchGroup not in self._attr_last_fetch:
+            return None
+        return round(time.monotonic() - self._attr_last_fetch[fetchGroup])
+
+    @property
+    def stats(self) -> PollStats:
+        """Rolling timings and failure counts of the poll phases."""
+        return self._attr_stats
+
+    @property
+    def catalog(self):
+        """Entity dicts of listEntities the platforms create their entities from."""
+        return self._attr_catalog
+
+    @property
+    def idleGroups(self) -> set[str]:
+        """GET groups the last poll skipped because no entity needs them."""
+        return self._attr_idle
+
+    @property
+    def streamingGroups(self) -> set[str]:
+        """GET groups currently streamed by a subscription instead of polled."""
+        return {group for group, subscription in self._attr_subscriptions.items() if subscription.streaming}
+
+    @property
+    def metrics(self) -> DerivedMetrics:
+        return self._attr_metrics
+
+    @property
+    def skippedWrites(self) -> int:
+        """Entity updates skipped by the last poll because their value was unchanged."""
+        return self._attr_skipped_writes
+
+    @property
+    def throttledWrites(self) -> int:
+        """Entity state writes held back by a deadband or minimum interval since start."""
+        return self._attr_throttled_writes
+
+    def countThrottled(self) -> None:
+        self._attr_throttled_writes += 1
+
+    def throttle(self, kind: str) -> PublishThrottle | None:
+        return self._attr_throttles.get(kind)
+
+    @property
+    def totalSkippedWrites(self) -> int:
+        return self._attr_total_skipped_writes
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE, context=None) -> CALLBACK_TYPE:
+        """Listen for data updates, indexed by the (group, index) context."""
+        remove = super().async_add_listener(update_callback, context)
+        if context is None:
+            return remove
+
+        callbacks = self._attr_listener_index.setdefault(context, [])
+        callbacks.append(update_callback)
+        groups = listenerGroups(context)
+        woken = False
+        for group in groups:
+            self._attr_group_listeners[group] = self._attr_group_listeners.get(group, 0) + 1
+            if group in self._attr_idle:
+                # an entity of a group that was not fetched got enabled
+                self._attr_idle.discard(group)
+                self._attr_last_fetch.pop(group, None)
+                woken = True
+        if woken:
+            getScheduler(self.hass).async_poll_now(self)
+
+        @callback
+        def remove_listener() -> None:
+            remove()
+            callbacks.remove(update_callback)
+            if not callbacks:
+                self._attr_listener_index.pop(context, None)
+            for group in groups:
+                self._attr_group_listeners[group] -= 1
+                if not self._attr_group_listeners[group]:
+                    del self._attr_group_listeners[group]
+
+        return remove_listener
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Notify only the listeners whose value changed in the last poll.
+
+        Everyone is notified on the first poll and whenever availability
+        changes, as well as listeners registered without a context.
+        """
+        start = time.perf_counter()
+        changed = self._attr_changed_keys
+        self._attr_changed_keys = None
+        if changed is None or self._attr_notified_success != self.last_update_success:
+            self._attr_notified_success = self.last_update_success
+            self._attr_skipped_writes = 0
+            super().async_update_listeners()
+            self._attr_stats.add("notify", time.perf_counter() - start)
+            return
+
+        for update_callback, context in list(self._listeners.values()):
+            if context is None:
+                update_callback()
+
+        notified = 0
+        for context in changed:
+            for update_callback in list(self._attr_listener_index.get(context, ())):
+                update_callback()
+                notified += 1
+
+        self._attr_skipped_writes = sum(map(len, self._attr_listener_index.values())) - notified
+        self._attr_total_skipped_writes += self._attr_skipped_writes
+        self._attr_stats.add("notify", time.perf_counter() - start)
+        _LOGGER.debug("Luxtronik poll notified "+str(notified)+" entities, skipped "+str(self._attr_skipped_writes))
+
+    async def async_shutdown(self) -> None:
+        """Stop polling and streaming, close the controller sessions and the recording."""
+        await super().async_shutdown()
+        await self._attr_session.async_close()
+        for subscription in self._attr_subscriptions.values():
+            await subscription.async_stop()
+        if self._attr_metrics_loaded:
+            await self._attr_metrics_store.async_save(self._attr_metrics.asDict())
+        if self._attr_recorder is not None:
+            await self._attr_recorder.async_close()
 
     async def _async_update_data(self):
         """Fetch data from API endpoint.
 
         This is the place to pre-process the data to lookup tables
         so entities can quickly look up their data.
+
+        A failed poll keeps the last values, marked stale, until
+        BREAKER_THRESHOLD polls in a row failed. Then the circuit breaker
+        opens: polls fail at once without touching the network until the
+        backoff is over, and a probe (login and one GET) has to succeed
+        before normal polling resumes.
         """
         # Note: asyncio.TimeoutError and aiohttp.ClientError are already
         # handled by the data update coordinator.
-        async with async_timeout.timeout(10):
-            await self._ainit()
-            # send ws queries for item ids
-            listedItems = list(list(self._attr_root)[1])
-
-            await self._attr_ws.send("GET;"+listedItems[2].attrib["id"])
-            result = await self._attr_ws.recv()
-            tempsettingsroot = ET.fromstring(result)
-
-            listedItems = list(list(self._attr_root)[0])
-
-            await self._attr_ws.send("GET;"+listedItems[1].attrib["id"])
-            result = await self._attr_ws.recv()
-            tempsroot = ET.fromstring(result)
-
-            await self._attr_ws.send("GET;"+listedItems[2].attrib["id"])
-            result = await self._attr_ws.recv()
-            inputsroot = ET.fromstring(result)
-
-            await self._attr_ws.send("GET;"+listedItems[3].attrib["id"])
-            result = await self._attr_ws.recv()
-            outputsroot = ET.fromstring(result)
-
-            await self._attr_ws.send("GET;"+listedItems[4].attrib["id"])
-            result = await self._attr_ws.recv()
-            timesroot = ET.fromstring(result)
-
-            await self._attr_ws.send("GET;"+listedItems[5].attrib["id"])
-            result = await self._attr_ws.recv()
-            hoursroot = ET.fromstring(result)
-
-            await self._attr_ws.send("GET;"+listedItems[8].attrib["id"])
-            result = await self._attr_ws.recv()
-            deviceinforoot = ET.fromstring(result)
-
-            await self._attr_ws.send("GET;"+listedItems[9].attrib["id"])
-            result = await self._attr_ws.recv()
-            energyroot = ET.fromstring(result)
-
-            await(self._attr_ws.close())
-
-            return {
-                "temperatures": tempsroot,
-                "inputs": inputsroot,
-                "outputs": outputsroot,
-                "deviceinfo": deviceinforoot,
-                "times": timesroot,
-                "hours": hoursroot,
-                "energyOutputs": list(energyroot)[0],
-                "energyInputs": list(energyroot)[1],
-                "tempSettings": tempsettingsroot,
-            }
-            # globber results to dict
-            # return result data
-
-    def appendXMLListToDictList(self, typeValue, swValue, xmlList, dict, groupName, maxIndex=99, *args):
-        i = 0
-        for item in xmlList:
-            sublist = list(item)
-            if len(sublist) == 2 and (len(args) == 0 or sublist[1].text.endswith(args[0])):
-                dict.append({"type": typeValue, "sw": swValue, "name": sublist[0].text, "index": i, "group": groupName })
-
-            i = i + 1
-            if i > maxIndex:
+        if self.breakerState == "open":
+            raise UpdateFailed(
+                "Luxtronik at "+self._attr_server+" is not answering, next try in "
+                +str(round(self._attr_breaker_until - time.monotonic()))+" s"
+            )
+
+        start = time.monotonic()
+        self._attr_poll_deadline = start + POLL_TIMEOUT
+        self._attr_received = None
+        timer = LoopTimer(self.poll())
+        try:
+            try:
+                async with async_timeout.timeout(POLL_TIMEOUT):
+                    data = await timer
+            except asyncio.TimeoutError:
+                if self._attr_received is None or not self._attr_received[2] or self.data is None:
+                    raise
+                # keep what the controller answered before the time ran out
+                now, due, replies = self._attr_received
+                missing = [group for group in due if group not in replies]
+                _LOGGER.warning("Luxtronik poll timed out waiting for "+", ".join(missing)+", keeping their last values")
+                data = await self.applyReplies(now, replies, missing)
+        except ControllerUnreachable as err:
+            self._attr_stats.fail("poll")
+            # the controller may have got a new address
+            now = time.monotonic()
+            if self._attr_relocated is None or now - self._attr_relocated > DISCOVERY_INTERVAL.total_seconds():
+                self._attr_relocated = now
+                self.hass.async_create_task(self.async_relocate())
+            return self.pollFailed(err)
+        except (UpdateFailed, asyncio.TimeoutError, websockets.exceptions.WebSocketException, OSError) as err:
+            self._attr_stats.fail("poll")
+            return self.pollFailed(err)
+        except BaseException:
+            self._attr_stats.fail("poll")
+            raise
+        finally:
+            self._attr_poll_duration = time.monotonic() - start
+            self._attr_stats.add("loop", timer.total)
+            _LOGGER.debug(
+                "Luxtronik poll took "+str(round(self._attr_poll_duration, 3))+" s, held the event loop for "
+                +str(round(timer.total * 1000, 1))+" ms (longest "+str(round(timer.longest * 1000, 1))+" ms)"
+            )
+
+        self._attr_stats.add("poll", self._attr_poll_duration)
+        if self._attr_breaker_until is not None:
+            _LOGGER.info("Luxtronik at "+self._attr_server+" answers again, polling resumed")
+        self._attr_failures = 0
+        self._attr_trips = 0
+        self._attr_breaker_until = None
+        return data
+
+    async def poll(self):
+        """Probe if the breaker is half open, then fetch the due groups."""
+        if self._attr_breaker_until is not None:
+            await self.probe()
+        try:
+            return await self._fetch()
+        except websockets.exceptions.ConnectionClosed:
+            # controller dropped the idle session, e.g. after a reboot;
+            # the session logs in again on next use
+            _LOGGER.info("Luxtronik session closed, logging in again")
+            return await self._fetch()
+
+    async def probe(self) -> None:
+        """Half-open breaker: log in and GET one group before a full poll."""
+        _LOGGER.debug("Luxtronik probing "+self._attr_server)
+        ids = await self.navigationIds()
+        _, missing = await self._attr_session.async_fetch({"deviceinfo": ids["deviceinfo"]}, self.requestTimeout())
+        if missing:
+            raise UpdateFailed("Luxtronik did not answer the probe")
+
+    def pollFailed(self, err: Exception):
+        """Keep the last values, marked stale, or open the circuit breaker.
+
+        Raises UpdateFailed once the breaker opens or when there is nothing
+        to keep, otherwise returns the previous snapshot.
+        """
+        self._attr_failures += 1
+        if self._attr_breaker_until is not None or self._attr_failures >= BREAKER_THRESHOLD:
+            self._attr_trips += 1
+            backoff = min(BREAKER_BACKOFF * 2 ** (self._attr_trips - 1), BREAKER_MAX_BACKOFF)
+            self._attr_breaker_until = time.monotonic() + backoff
+            _LOGGER.warning(
+                "Luxtronik at "+self._attr_server+" failed "+str(self._attr_failures)
+                +" polls in a row, pausing for "+str(backoff)+" s"
+            )
+            raise UpdateFailed("Luxtronik poll failed: "+str(err)) from err
+
+        if self.data is None:
+            raise UpdateFailed("Luxtronik poll failed: "+str(err)) from err
+
+        _LOGGER.info("Luxtronik poll failed ("+str(err)+"), keeping the last values")
+        stale = set(self.dueGroups(time.monotonic())) | self._attr_stale
+        self._attr_changed_keys = self.markStale(self.data, stale)
+        return self.data
+
+    def markStale(self, snapshot, stale: set[str]) -> set[tuple[str, int]]:
+        """Set the stale GET groups, returns the keys whose stale state or age changed."""
+        changed = self._attr_stale | stale
+        self._attr_stale = stale
+        return {
+            (snapshotGroup, index)
+            for group in changed
+            for snapshotGroup in SNAPSHOT_GROUPS.get(group, (group,))
+            for index in snapshot.indices(snapshotGroup)
+        }
+
+    def wantedGroups(self) -> set[str]:
+        """GET groups an entity or the coordinator itself needs.
+
+        deviceinfo is always read for the firmware check, outputs too in
+        adaptive mode.
+        """
+        wanted = set(self._attr_group_listeners)
+        wanted.add("deviceinfo")
+        if self._attr_adaptive:
+            wanted.add("outputs")
+        return wanted
+
+    def dueGroups(self, now: float) -> list[str]:
+        """GET groups whose own interval has elapsed and that are wanted.
+
+        Half an update interval of slack keeps a group from slipping a whole
+        poll late because of timer jitter. Every group is fetched once, so
+        the snapshot can list all entities; after that a group without
+        enabled entities is left idle until one of them is enabled, and a
+        group streamed by a subscription is not polled while it streams.
+        """
+        slack = self._attr_poll_interval.total_seconds() / 2
+        lastFetch = self._attr_last_fetch
+        due = [
+            group for group, interval in self._attr_group_intervals.items()
+            if group not in lastFetch or now - lastFetch[group] + slack >= interval
+        ]
+        wanted = self.wantedGroups()
+        self._attr_idle = {group for group in due if group in lastFetch and group not in wanted}
+        streaming = self.streamingGroups
+        return [group for group in due if group not in self._attr_idle and group not in streaming]
+
+    async def _fetch(self):
+        now = time.monotonic()
+        due = self.dueGroups(now)
+        if not due:
+            self._attr_changed_keys = set()
+            return self.data
+
+        replies = {}
+        self._attr_received = (now, due, replies)
+        missing = await self.fetchReplies(due, replies)
+        return await self.applyReplies(now, replies, missing)
+
+    def requestTimeout(self) -> float:
+        """Seconds a GET may wait, REQUEST_TIMEOUT within the rest of the poll budget."""
+        if self._attr_poll_deadline is None:
+            return REQUEST_TIMEOUT
+        return max(min(REQUEST_TIMEOUT, self._attr_poll_deadline - POLL_RESERVE - time.monotonic()), 0)
+
+    async def fetchReplies(self, due: list[str], replies: dict[str, str]) -> list[str]:
+        """GET the due groups into replies, returns the groups that did not answer.
+
+        Page ids read from storage may be stale after a firmware update.
+        When none of them is answered the navigation is read again and the
+        GETs retried within the time left; when only some are, the others
+        most likely just timed out, and the navigation is read again on
+        the next poll instead.
+        """
+        session = self._attr_session
+        ids = await self.navigationIds()
+        _, missing = await session.async_fetch({group: ids[group] for group in due}, self.requestTimeout(), replies)
+        if missing and self._attr_navigation_stored:
+            self._attr_navigation = None
+            self._attr_navigation_stored = False
+            if replies:
+                _LOGGER.info(
+                    "Luxtronik did not answer stored page ids for "+", ".join(missing)
+                    +", reading navigation again on the next poll"
+                )
+            elif self.requestTimeout() > 0:
+                _LOGGER.info("Luxtronik did not answer stored page ids, reading navigation again")
+                await session.async_login()
+                ids = await self.navigationIds()
+                _, missing = await session.async_fetch(
+                    {group: ids[group] for group in missing}, self.requestTimeout(), replies
+                )
+        elif not missing:
+            self._attr_navigation_stored = False
+        if missing and (not replies or self.data is None):
+            raise UpdateFailed("Luxtronik did not answer for "+", ".join(missing))
+        if missing:
+            # the groups that did not answer keep their last values and
+            # are fetched again on the next poll
+            _LOGGER.warning("Luxtronik did not answer for "+", ".join(missing)+", keeping their last values")
+        return missing
+
+    async def applyReplies(self, now: float, replies: dict[str, str], missing: list[str]):
+        """Build the snapshot of a poll from its replies."""
+        self._attr_received = None
+        for group in replies:
+            # unless a subscription streamed it since the poll started
+            if self._attr_last_fetch.get(group, now) <= now:
+                self._attr_last_fetch[group] = now
+
+        if self._attr_recorder is not None:
+            self._attr_recorder.record(replies)
+
+        previous = self.data
+        snapshot = LuxtronikSnapshot()
+        if previous is not None:
+            # keep the groups that were not due or did not answer from the
+            # previous poll
+            for group in GROUP_POSITIONS:
+                if group not in replies:
+                    snapshot.copyGroups(self.data, SNAPSHOT_GROUPS.get(group, (group,)))
+
+        if sum(map(len, replies.values())) > DECODE_EXECUTOR_SIZE:
+            # large replies would hold up the event loop. The worker thread
+            # mutates self._attr_decoder: streamed() may decode a group that
+            # started streaming during this poll at the same time, which
+            # only replaces whole parsers, so at worst one is compiled
+            # twice. It only reads self.data, which streamed() replaces but
+            # never changes. self._attr_stats is read on the event loop and
+            # only updated there, streamed groups are taken over below
+            seconds = await self.hass.async_add_executor_job(self.decodeReplies, snapshot, replies)
+        else:
+            seconds = self.decodeReplies(snapshot, replies)
+        self._attr_stats.add("parse", seconds)
+
+        if "deviceinfo" in replies:
+            await self.checkFirmware(snapshot)
+
+        if self._attr_adaptive and ("outputs" in replies or "deviceinfo" in replies):
+            self.adaptInterval(snapshot)
+
+        metrics = set()
+        if "energy" in replies or "hours" in replies:
+            metrics = await self.updateMetrics(snapshot)
+
+        if self.data is not previous:
+            # subscriptions streamed while this poll awaited, their groups
+            # are newer than the ones copied or decoded above
+            for group in GROUP_POSITIONS:
+                if group not in replies or self._attr_last_fetch.get(group, 0) > now:
+                    snapshot.copyGroups(self.data, SNAPSHOT_GROUPS.get(group, (group,)))
+
+        stale = (self._attr_stale - set(replies)) | set(missing)
+        if self.data is not None:
+            self._attr_changed_keys = snapshot.changedKeys(self.data) | self.markStale(snapshot, stale) | metrics
+        else:
+            self._attr_stale = stale
+
+        # the page ids are known now
+        for subscription in self._attr_subscriptions.values():
+            subscription.start(self.hass)
+        return snapshot
+
+    def decodeReplies(self, snapshot, replies: dict[str, str]) -> float:
+        """Decode the GET replies of a poll into its snapshot, returns the seconds it took."""
+        start = time.monotonic()
+        for group, result in replies.items():
+            snapshot.addReply(group, result, SNAPSHOT_GROUPS.get(group), self._attr_decoder, self.data)
+        return time.monotonic() - start
+
+    def pageId(self, group: str) -> str | None:
+        """Page id of a group once the navigation is known."""
+        if self._attr_navigation is None:
+            return None
+        return self._attr_navigation["ids"].get(group)
+
+    @callback
+    def streamed(self, group: str, result: str) -> None:
+        """Take a reply streamed by a subscription into the snapshot.
+
+        Listeners are only notified when a value changed.
+        """
+        if self.data is None:
+            return
+        if self._attr_recorder is not None:
+            self._attr_recorder.record({group: result})
+
+        snapshot = LuxtronikSnapshot()
+        snapshot.copyGroups(self.data, list(self.data.groups))
+        snapshot.addReply(group, result, SNAPSHOT_GROUPS.get(group), self._attr_decoder, self.data)
+        self._attr_last_fetch[group] = time.monotonic()
+
+        changed = snapshot.changedKeys(self.data)
+        if group in self._attr_stale:
+            changed |= self.markStale(snapshot, self._attr_stale - {group})
+        if not changed:
+            return
+        self._attr_changed_keys = changed
+        self.async_set_updated_data(snapshot)
+
+    async def updateMetrics(self, snapshot) -> set[tuple[str, str]]:
+        """Add the counters of a poll to the metric windows, returns the contexts of changed metrics."""
+        if not self._attr_metrics_loaded:
+            self._attr_metrics_loaded = True
+            state = await self._attr_metrics_store.async_load()
+            if state is not None:
+                self._attr_metrics = DerivedMetrics(**state)
+
+        changed = self._attr_metrics.add(time.time(), snapshot, self.profile(snapshot).counters)
+        self._attr_metrics_store.async_delay_save(self._attr_metrics.asDict, METRICS_SAVE_DELAY)
+        return {("metrics", metric+"_"+window) for metric, window in changed}
+
+    def profile(self, snapshot) -> ProfileIndex:
+        """Firmware profile for the Softwarestand of a snapshot, looked up again when it changes."""
+        item = snapshot.get("deviceinfo", 1)
+        firmware = item.raw if item is not None else ""
+        if self._attr_profile is None or self._attr_profile[0] != firmware:
+            self._attr_profile = (firmware, profileIndex(profileName(firmware)))
+        return self._attr_profile[1]
+
+    def adaptInterval(self, snapshot) -> None:
+        """Poll at the minimum interval while the unit works, back off while it idles.
+
+        A change of the compressor, defrost or operating state counts as
+        activity too, so a start-up is followed closely. Every idle poll
+        doubles the interval up to the maximum.
+        """
+        running, states = activity(snapshot)
+        changed = self._attr_activity is not None and states != self._attr_activity
+        self._attr_activity = states
+        if running or changed:
+            interval = self._attr_min_interval
+        else:
+            interval = min(self._attr_poll_interval * 2, self._attr_max_interval)
+
+        if interval != self._attr_poll_interval:
+            _LOGGER.debug(
+                "Luxtronik "+("active" if running or changed else "idle")
+                +", polling every "+str(interval.total_seconds())+" s"
+            )
+            self._attr_poll_interval = interval
+
+    async def async_relocate(self) -> None:
+        """Find the controller at another address after it became unreachable.
+
+        Discovered controllers that no config entry uses are tried with the
+        password of this entry. The first one that accepts it becomes the
+        new server of the entry, which reloads it.
+        """
+        discovery = getDiscovery(self.hass)
+        configured = {entry.data["server"] for entry in self.hass.config_entries.async_entries(DOMAIN)}
+        candidates = [server for server in discovery.controllers if server not in configured]
+        if not candidates:
+            candidates = [server for server in await discovery.async_scan() if server not in configured]
+
+        for server in candidates:
+            ws, root, _, loggedin = await getWebsocket(server, self._attr_password)
+            if not loggedin:
+                continue
+
+            _LOGGER.warning("Luxtronik controller moved from "+self._attr_server+" to "+server)
+            pending = self.hass.data.setdefault(DOMAIN, {}).setdefault(PENDING_SESSIONS, {})
+            pending[server] = LuxtronikSession(server, self._attr_password, ws, root)
+            self.hass.config_entries.async_update_entry(
+                self._attr_entry, data={**self._attr_entry.data, "server": server}
+            )
+            return
+
+    async def async_load_catalog(self):
+        """Entity dicts stored by an earlier setup, None if there are none."""
+        self._attr_catalog = await self._attr_catalog_store.async_load()
+        return self._attr_catalog
+
+    async def async_save_catalog(self, catalog) -> None:
+        self._attr_catalog = catalog
+        await self._attr_catalog_store.async_save(catalog)
+
+    @callback
+    def async_watch_catalog(self) -> CALLBACK_TYPE:
+        """Check the stored catalog against the first successful poll.
+
+        When the controller lists other entities, e.g. after a firmware
+        update, the catalog is replaced and the entry reloaded. Returns a
+        callback that stops watching.
+        """
+        removed = False
+
+        @callback
+        def stop() -> None:
+            nonlocal removed
+            if not removed:
+                removed = True
+                remove()
+
+        @callback
+        def check() -> None:
+            if self.data is None:
                 return
+            stop()
+            catalog = self.listEntities()
+            if catalog != self._attr_catalog:
+                _LOGGER.info("Luxtronik entities changed since the last start, reloading")
+                self.hass.async_create_task(self.async_replace_catalog(catalog))
 
-    def listEntities(self):
-        root = self.data["deviceinfo"]
-        listed = list(root)
-        typeValue = list(listed[0])[1].text
-        swValue = list(listed[1])[1].text
-        stateName = list(listed[7])[0].text
-        capacityName = list(listed[8])[0].text
-
-        stringDicts = [{"type": typeValue, "sw": swValue, "name": stateName, "index": 7, "group": "deviceinfo" }]
-
-        powerDicts = [{"type": typeValue, "sw": swValue, "name": capacityName, "index": 8, "group": "deviceinfo" }]
-
-        listed = list(self.data["temperatures"])
-        tempDicts = []
-        self.appendXMLListToDictList(typeValue, swValue, listed, tempDicts, "temperatures")
-
-        listed = list(self.data["tempSettings"])
-        tempDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[1])[0].text, "index": 1, "group": "tempSettings" })
-        tempDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[2])[0].text, "index": 2, "group": "tempSettings" })
-
-        listed = list(self.data["inputs"])
-        pressureDicts = []
-        pressureDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[4])[0].text, "index": 4, "group": "inputs" })
-        pressureDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[5])[0].text, "index": 5, "group": "inputs" })
-        self.appendXMLListToDictList(typeValue, swValue, listed, stringDicts, "inputs", 3)
-
-        listed = list(self.data["outputs"])
-        frequencyDicts = [{"type": typeValue, "sw": swValue, "name": list(listed[10])[0].text, "index": 10, "group": "outputs" }]
-        percentageDicts = []
-        percentageDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[12])[0].text, "index": 12, "group": "outputs" })
-        percentageDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[13])[0].text, "index": 13, "group": "outputs" })
-        self.appendXMLListToDictList(typeValue, swValue, listed, stringDicts, "outputs", 9)
-
-        listed = list(self.data["energyOutputs"])
-        energyDicts = []
-        energyDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[1])[0].text+" (output)", "index": 1, "group": "energyOutputs" })
-        energyDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[2])[0].text+" (output)", "index": 2, "group": "energyOutputs" })
-        energyDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[3])[0].text+" (output)", "index": 3, "group": "energyOutputs" })
-
-        listed = list(self.data["energyInputs"])
-        energyDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[1])[0].text+" (input)", "index": 1, "group": "energyInputs" })
-        energyDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[2])[0].text+" (input)", "index": 2, "group": "energyInputs" })
-        energyDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[3])[0].text+" (input)", "index": 3, "group": "energyInputs" })
-
-        listed = list(self.data["times"])
-        timeDicts = []
-        self.appendXMLListToDictList(typeValue, swValue, listed, timeDicts, "times")
-
-        listed = list(self.data["hours"])
-        hourDicts = []
-        self.appendXMLListToDictList(typeValue, swValue, listed, hourDicts, "hours", 99, "h")
-        timeDicts.append({"type": typeValue, "sw": swValue, "name": list(listed[2])[0].text, "index": 2, "group": "hours" })
-        counterDicts = [{"type": typeValue, "sw": swValue, "name": list(listed[1])[0].text, "index": 1, "group": "hours" }]
+        remove = self.async_add_listener(check)
+        return stop
 
-        return {
-            "tempDicts": tempDicts,
-            "pressureDicts": pressureDicts,
-            "frequencyDicts": frequencyDicts,
-            "percentageDicts": percentageDicts,
-            "powerDicts": powerDicts,
-            "energyDicts": energyDicts,
-            "timeDicts": timeDicts,
-            "stringDicts": stringDicts,
-            "hourDicts": hourDicts,
-            "counterDicts": counterDicts
-        }
+    async def async_replace_catalog(self, catalog) -> None:
+        await self.async_save_catalog(catalog)
+        await self.hass.config_entries.async_reload(self._attr_entry.entry_id)
+
+    async def navigationIds(self) -> dict[str, str]:
+        """Page id of every group, logging the session in if needed.
+
+        The ids are read from storage when they are known for this
+        controller, otherwise they are resolved from the Navigation reply
+        of the login.
+        """
+        if not self._attr_navigation_loaded:
+            self._attr_navigation = await self._attr_navigation_store.async_load()
+            self._attr_navigation_loaded = True
+            self._attr_navigation_stored = self._attr_navigation is not None
+
+        session = self._attr_session
+        if self._attr_navigation is None:
+            await session.async_ensure()
+            self._attr_navigation = {"firmware": None, "ids": buildNavigationIndex(session.root)}
+            self._attr_navigation_stored = False
+        else:
+            await session.async_ensure(navigation=False)
+        return self._attr_navigation["ids"]
+
+    async def checkFirmware(self, snapshot) -> None:
+        """Store the page ids for the running firmware, drop them when it changed."""
+        item = snapshot.get("deviceinfo", 1)
+        if item is None:
+            return
+
+        navigation = self._attr_navigation
+        if navigation is None:
+            # read again on the next poll
+            return
+        if navigation["firmware"] is None:
+            navigation["firmware"] = item.raw
+            await self._attr_navigation_store.async_save(navigation)
+        elif navigation["firmware"] != item.raw:
+            _LOGGER.info("Luxtronik firmware changed to "+item.raw+", reading navigation again")
+            self._attr_navigation = None
+
+    def listEntities(self):
+        """Entity dicts of the current snapshot by catalog list, as the firmware profile classifies them."""
+        data = self.data
+        typeValue = data.get("deviceinfo", 0).raw
+        swValue = data.get("deviceinfo", 1).raw
+        return profileIndex(profileName(swValue)).catalog(data, typeValue, swValue)
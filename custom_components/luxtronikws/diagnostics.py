@@ -0,0 +1,54 @@
+"""Diagnostics support for Luxtronik WS."""
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .lux_ip import getDiscovery
+from .metrics import METRICS
+from .scheduler import getScheduler
+
+TO_REDACT = {"password"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return the poll statistics and state of a config entry."""
+    diagnostics = {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "discovered": getDiscovery(hass).controllers,
+    }
+
+    coordinator = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if coordinator is None:
+        return diagnostics
+
+    now = time.monotonic()
+    diagnostics["coordinator"] = {
+        "last_update_success": coordinator.last_update_success,
+        "last_exception": repr(coordinator.last_exception) if coordinator.last_exception else None,
+        "poll_interval": coordinator.pollInterval.total_seconds(),
+        "group_intervals": coordinator.groupIntervals,
+        "group_ages": {
+            group: round(now - fetched, 1) for group, fetched in coordinator.lastFetch.items()
+        },
+        "idle_groups": sorted(coordinator.idleGroups),
+        "streaming_groups": sorted(coordinator.streamingGroups),
+        "stale_groups": sorted(coordinator.staleGroups),
+        "breaker": coordinator.breakerState,
+        "failures_in_a_row": coordinator.failures,
+        "navigation": coordinator.navigation,
+        "total_skipped_writes": coordinator.totalSkippedWrites,
+        "throttled_writes": coordinator.throttledWrites,
+        "metrics": {metric+"_"+window: coordinator.metrics.value(metric, window) for metric, window in METRICS},
+    }
+    diagnostics["stats"] = coordinator.stats.asDict()
+    diagnostics["scheduler"] = getScheduler(hass).latencies().get(coordinator.server)
+    return diagnostics
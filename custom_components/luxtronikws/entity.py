@@ -0,0 +1,110 @@
+"""Base entity shared by the Luxtronik WS platforms."""
+from __future__ import annotations
+
+from functools import lru_cache
+import logging
+import sys
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.update_coordinator import (
+    CoordinatorEntity,
+)
+
+from .const import (
+    DOMAIN,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=8)
+def deviceInfo(entryId: str, model: str, swVersion: str) -> DeviceInfo:
+    """Device info of a controller, one instance shared by all of its entities.
+
+    The device is identified by its config entry, controllers of the same
+    model are different devices.
+    """
+    manuf = "ACME"
+    if model.startswith("MSW"):
+        manuf = "Alpha Innotec"
+
+    return DeviceInfo(
+        identifiers={(DOMAIN, entryId)},
+        name=model,
+        model=model,
+        suggested_area="Kitchen",
+        manufacturer=manuf,
+        sw_version=swVersion,
+    )
+
+
+def uniqueId(entryId: str, entityDict) -> str:
+    """Unique id of the entity of a catalog entry, prefixed with its config entry."""
+    return entryId+"_"+entityDict["name"]+str(entityDict["index"])
+
+
+@callback
+def removeEntities(hass: HomeAssistant, platform: str, uniqueIds) -> None:
+    """Remove the registry entries of entities this integration no longer creates."""
+    registry = er.async_get(hass)
+    for uniqueId in uniqueIds:
+        entityId = registry.async_get_entity_id(platform, DOMAIN, uniqueId)
+        if entityId is not None:
+            _LOGGER.info("Removing obsolete entity "+entityId)
+            registry.async_remove(entityId)
+
+
+class LuxtronikCoordinatorEntity(CoordinatorEntity):
+    """A value of the shared coordinator snapshot, found by (group, index)"""
+    def __init__(self, entityDict, coordinator) -> None:
+        """Pass coordinator to CoordinatorEntity."""
+        # strings shared with the snapshot and every other entity
+        self._attr_group = sys.intern(entityDict["group"])
+        self._attr_index = entityDict["index"]
+        super().__init__(coordinator, context=(self._attr_group, self._attr_index))
+        self._attr_has_entity_name = True
+        self._attr_name = sys.intern(entityDict["name"])
+        self._attr_unique_id = uniqueId(coordinator.entryId, entityDict)
+        self._attr_device_info = deviceInfo(coordinator.entryId, entityDict["type"], entityDict["sw"])
+        _LOGGER.debug("Luxtronik entity "+entityDict["name"] +" created")
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        """Age of the value while the controller did not answer for its group."""
+        age = self.coordinator.staleAge(self._attr_group)
+        if age is None:
+            return None
+        return {"stale": True, "age": age}
+
+    def item(self):
+        """Snapshot item of this entity, None before the first poll or if the controller lost it."""
+        if self.coordinator.data is None:
+            return None
+        return self.coordinator.data.get(self._attr_group, self._attr_index)
+
+    def updateValue(self) -> None:
+        """Take the current value from the snapshot."""
+        raise NotImplementedError
+
+    async def restoreValue(self) -> None:
+        """Take the value saved at the last shutdown, the platforms that restore state implement it."""
+
+    async def async_added_to_hass(self) -> None:
+        """Start with the current value, the coordinator only notifies on change.
+
+        Before the first poll the state saved at the last shutdown is shown.
+        """
+        await super().async_added_to_hass()
+        if self.coordinator.data is not None:
+            self.updateValue()
+        else:
+            await self.restoreValue()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self.updateValue()
+        _LOGGER.debug("Luxtronik entity polled")
+        self.async_write_ha_state()
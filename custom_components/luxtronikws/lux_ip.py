@@ -1,56 +1,109 @@
-import socket
 import asyncio
+from ipaddress import ip_interface
+import logging
+import time
 
-class LuxListener:
-	def __init__(self, on_con_lost):
-		self._attr_ip = self.getIPAddress()
-		self.on_con_lost = on_con_lost
-		self._attr_lux_ip = None
+from homeassistant.components import network
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
 
-	def connection_made(self, transport):
-		self.transport = transport
+from .const import DISCOVERY, DISCOVERY_INTERVAL, DISCOVERY_WINDOW, DOMAIN
 
-	def connection_lost(self, transport):
-		if not self.on_con_lost.cancelled():
-			self.on_con_lost.set_result(True)
+_LOGGER = logging.getLogger(__name__)
+
+LUX_PORT = 4444
+LUX_QUERY = bytes([0x32, 0x30, 0x30, 0x30, 0x3b, 0x31, 0x31, 0x31, 0x3b, 0x31, 0x3b, 0x00, 0x00, 0x00, 0x20, 0x20, 0x20, 0x20])
+
+class LuxListener(asyncio.DatagramProtocol):
+	def __init__(self, ownAddresses, found):
+		self._attr_own_addresses = ownAddresses
+		self._attr_found = found
 
 	def datagram_received(self, data, addr):
-		if addr[1] == 4444 and addr[0] != self._attr_ip:
-			self._attr_lux_ip = addr[0]
-			self.transport.close()
-
-	def getLuxIp(self):
-		return self._attr_lux_ip
-
-	def getIPAddress(self):
-		s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-		s.connect(("8.8.8.8", 80))
-		return s.getsockname()[0]
-
-async def getLuxIp():
-	# Get a reference to the event loop as we plan to use
-	# low-level APIs.
-	loop = asyncio.get_running_loop()
-	on_con_lost = loop.create_future()
-	# One protocol instance will be created to serve all
-	# client requests.
-	luxListener = LuxListener(on_con_lost)
-	transport, protocol = await loop.create_datagram_endpoint(
-		lambda: luxListener,
-		local_addr=('0.0.0.0', 4444))
-	luxIp = "static.luxtronik.ip.here"
-
-	try:
-		buffer = bytes([0x32, 0x30, 0x30, 0x30, 0x3b, 0x31, 0x31, 0x31, 0x3b, 0x31, 0x3b, 0x00, 0x00, 0x00, 0x20, 0x20, 0x20, 0x20])
-		ssock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)  # UDP
-		ssock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-		ssock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-		ssock.sendto(buffer, ("255.255.255.255", 4444))
-		await asyncio.wait_for(on_con_lost, timeout=2)
-		luxIp = luxListener.getLuxIp()
-	except asyncio.exceptions.TimeoutError:
-		on_con_lost.cancel()
-	finally:
-		transport.close()
-
-	return luxIp
\ No newline at end of file
+		# our own broadcast comes back on every interface
+		if addr[1] == LUX_PORT and addr[0] not in self._attr_own_addresses:
+			self._attr_found[addr[0]] = time.monotonic()
+
+def getDiscovery(hass: HomeAssistant):
+	data = hass.data.setdefault(DOMAIN, {})
+	if DISCOVERY not in data:
+		data[DISCOVERY] = LuxDiscovery(hass)
+	return data[DISCOVERY]
+
+class LuxDiscovery:
+	"""Find Luxtronik controllers by broadcasting on port 4444.
+
+	Every responder within the window is collected and cached, so the
+	config flow can show them without waiting. While started, the network
+	is scanned again periodically, which lets a controller that got a new
+	DHCP address be found again.
+	"""
+
+	def __init__(self, hass: HomeAssistant):
+		self._attr_hass = hass
+		self._attr_controllers = {}
+		self._attr_lock = asyncio.Lock()
+		self._attr_unsub = None
+
+	@property
+	def controllers(self):
+		"""Addresses of the controllers found so far, most recently seen first."""
+		return sorted(self._attr_controllers, key=self._attr_controllers.get, reverse=True)
+
+	async def getAddresses(self):
+		"""Own IPv4 addresses and the broadcast address of every interface."""
+		ownAddresses = set()
+		broadcasts = {"255.255.255.255"}
+		for adapter in await network.async_get_adapters(self._attr_hass):
+			for ipInfo in adapter["ipv4"]:
+				ownAddresses.add(ipInfo["address"])
+				interface = ip_interface(ipInfo["address"]+"/"+str(ipInfo["network_prefix"]))
+				broadcasts.add(str(interface.network.broadcast_address))
+		return ownAddresses, broadcasts
+
+	async def async_scan(self, window: float = DISCOVERY_WINDOW):
+		"""Broadcast a query and collect every controller answering within window seconds."""
+		async with self._attr_lock:
+			ownAddresses, broadcasts = await self.getAddresses()
+			found = {}
+			loop = asyncio.get_running_loop()
+			try:
+				transport, _ = await loop.create_datagram_endpoint(
+					lambda: LuxListener(ownAddresses, found),
+					local_addr=("0.0.0.0", LUX_PORT),
+					allow_broadcast=True)
+			except OSError as err:
+				_LOGGER.warning("Luxtronik discovery could not listen on port "+str(LUX_PORT)+": "+str(err))
+				return self.controllers
+
+			try:
+				for broadcast in broadcasts:
+					try:
+						transport.sendto(LUX_QUERY, (broadcast, LUX_PORT))
+					except OSError as err:
+						_LOGGER.debug("Luxtronik discovery broadcast to "+broadcast+" failed: "+str(err))
+				await asyncio.sleep(window)
+			finally:
+				transport.close()
+
+			self._attr_controllers.update(found)
+			_LOGGER.debug("Luxtronik discovery found "+", ".join(found))
+			return self.controllers
+
+	@callback
+	def async_start(self):
+		"""Scan now and then every DISCOVERY_INTERVAL."""
+		if self._attr_unsub is not None:
+			return
+
+		async def scan(_now=None):
+			await self.async_scan()
+
+		self._attr_hass.async_create_task(scan())
+		self._attr_unsub = async_track_time_interval(self._attr_hass, scan, DISCOVERY_INTERVAL)
+
+	@callback
+	def async_stop(self):
+		if self._attr_unsub is not None:
+			self._attr_unsub()
+			self._attr_unsub = None
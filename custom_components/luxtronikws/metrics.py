@@ -0,0 +1,178 @@
+"""COP, heat per compressor hour and cycle rates from the controller's counters."""
+from __future__ import annotations
+
+from collections import deque
+
+# cumulative counters the metrics are derived from: total heat produced
+# (kWh), total electricity used (kWh), compressor operating hours and
+# compressor starts. The firmware profile names the item of each.
+COUNTERS = ("heat", "electricity", "compressor_hours", "compressor_starts")
+HEAT, ELECTRICITY, COMPRESSOR_HOURS, COMPRESSOR_STARTS = range(len(COUNTERS))
+
+# window name: (length in seconds, number of buckets)
+WINDOWS = {
+    "hour": (3600, 12),
+    "day": (86400, 24),
+    "month": (30 * 86400, 30),
+}
+
+# the energy counters move in 0.1 kWh steps: the "last" COP spans at
+# least this much electricity, ending at a change of its counter
+LAST_COP_ELECTRICITY = 0.5
+# compressor hours are whole numbers, heat per compressor hour needs at
+# least this many of them
+MIN_COMPRESSOR_HOURS = 4
+
+# (metric, window) of every derived value
+METRICS = (
+    [("cop", window) for window in ("last", *WINDOWS)]
+    + [("heat_per_compressor_hour", window) for window in WINDOWS if window != "hour"]
+    + [("cycles_per_hour", window) for window in WINDOWS]
+)
+# metrics of earlier versions, their entities are removed
+OBSOLETE_METRICS = (("heat_per_compressor_hour", "hour"),)
+
+
+def readCounters(snapshot, counters) -> tuple | None:
+    """Current counter values, None unless all of them are numbers.
+
+    counters holds the (group, item name) of every counter, in the order
+    of COUNTERS, or is None if the firmware profile names none.
+    """
+    if counters is None:
+        return None
+    values = []
+    for group, name in counters:
+        item = snapshot.find(group, name)
+        if item is None or not isinstance(item.value, (int, float)):
+            return None
+        values.append(item.value)
+    return tuple(values)
+
+
+class CounterWindow:
+    """Increase of cumulative counters over a sliding window.
+
+    The counter values at the start of each bucket (window / buckets long)
+    are kept. The increase over the window is the latest values minus the
+    oldest kept ones, so adding a sample is O(1) amortized and memory is
+    bounded by the number of buckets.
+    """
+
+    def __init__(self, window: float, buckets: int, samples=(), latest=None) -> None:
+        self._attr_window = window
+        self._attr_bucket = window / buckets
+        self._attr_samples = deque((time, tuple(values)) for time, values in samples)
+        self._attr_latest = (latest[0], tuple(latest[1])) if latest is not None else None
+
+    def add(self, now: float, values: tuple) -> None:
+        samples = self._attr_samples
+        latest = self._attr_latest
+        if latest is not None and any(value < old for value, old in zip(values, latest[1])):
+            # a counter went back, e.g. after a controller reset
+            samples.clear()
+        if not samples or now - samples[-1][0] >= self._attr_bucket:
+            samples.append((now, values))
+        self._attr_latest = (now, values)
+
+        # start at the newest sample that is at least a window old, or at the
+        # oldest one within the window after a gap
+        window = self._attr_window
+        while len(samples) > 1 and (
+            now - samples[1][0] >= window or now - samples[0][0] > window + self._attr_bucket
+        ):
+            samples.popleft()
+
+    def increase(self) -> tuple[float, tuple] | None:
+        """Seconds covered and the increase of every counter, None without two samples."""
+        samples = self._attr_samples
+        latest = self._attr_latest
+        if not samples or latest is None or latest[0] <= samples[0][0]:
+            return None
+        start, first = samples[0]
+        return latest[0] - start, _delta(latest[1], first)
+
+    def asDict(self) -> dict:
+        return {"samples": list(self._attr_samples), "latest": self._attr_latest}
+
+
+class DerivedMetrics:
+    """Rolling windows of the counters and the metrics computed from them.
+
+    Every poll that read the counters costs O(1) per window, the metric
+    values are kept so entities only read them.
+    """
+
+    def __init__(self, windows=None, previous=None, latest=None) -> None:
+        self._attr_windows = {
+            name: CounterWindow(length, buckets, **(windows or {}).get(name, {}))
+            for name, (length, buckets) in WINDOWS.items()
+        }
+        # time and counters at the start and end of the last interval
+        # of at least LAST_COP_ELECTRICITY
+        self._attr_previous = (previous[0], tuple(previous[1])) if previous is not None else None
+        self._attr_latest = (latest[0], tuple(latest[1])) if latest is not None else None
+        self._attr_values: dict[tuple[str, str], float | None] = {metric: None for metric in METRICS}
+        self.compute()
+
+    def value(self, metric: str, window: str) -> float | None:
+        return self._attr_values.get((metric, window))
+
+    def add(self, now: float, snapshot, counters) -> set[tuple[str, str]]:
+        """Add the counters of a poll, found as readCounters does, returns the metrics whose value changed."""
+        counters = readCounters(snapshot, counters)
+        if counters is None:
+            return set()
+
+        for window in self._attr_windows.values():
+            window.add(now, counters)
+        latest = self._attr_latest
+        if latest is not None and any(value < old for value, old in zip(counters, latest[1])):
+            # a counter went back, the last interval is unknown
+            self._attr_previous = None
+            self._attr_latest = (now, counters)
+        elif latest is None:
+            self._attr_latest = (now, counters)
+        elif round(counters[ELECTRICITY] - latest[1][ELECTRICITY], 3) >= LAST_COP_ELECTRICITY:
+            self._attr_previous = latest
+            self._attr_latest = (now, counters)
+        return self.compute()
+
+    def compute(self) -> set[tuple[str, str]]:
+        """Recompute the metric values, returns the ones that changed."""
+        values = {metric: None for metric in METRICS}
+        if self._attr_previous is not None:
+            values[("cop", "last")] = cop(_delta(self._attr_latest[1], self._attr_previous[1]))
+
+        for name, window in self._attr_windows.items():
+            increase = window.increase()
+            if increase is None:
+                continue
+            seconds, delta = increase
+            values[("cop", name)] = cop(delta)
+            if ("heat_per_compressor_hour", name) in values and delta[COMPRESSOR_HOURS] >= MIN_COMPRESSOR_HOURS:
+                values[("heat_per_compressor_hour", name)] = round(delta[HEAT] / delta[COMPRESSOR_HOURS], 2)
+            values[("cycles_per_hour", name)] = round(delta[COMPRESSOR_STARTS] * 3600 / seconds, 2)
+
+        changed = {metric for metric, value in values.items() if self._attr_values[metric] != value}
+        self._attr_values = values
+        return changed
+
+    def asDict(self) -> dict:
+        """State to persist, DerivedMetrics(**state) restores it."""
+        return {
+            "windows": {name: window.asDict() for name, window in self._attr_windows.items()},
+            "previous": self._attr_previous,
+            "latest": self._attr_latest,
+        }
+
+
+def _delta(values: tuple, old: tuple) -> tuple:
+    return tuple(value - previous for value, previous in zip(values, old))
+
+
+def cop(delta: tuple) -> float | None:
+    """Heat produced per electricity used, None while no electricity was used."""
+    if delta[ELECTRICITY] <= 0:
+        return None
+    return round(delta[HEAT] / delta[ELECTRICITY], 2)
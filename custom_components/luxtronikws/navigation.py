@@ -0,0 +1,57 @@
+"""Resolve the GET id of each coordinator group from the Navigation tree."""
+from __future__ import annotations
+
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# (section names, page names) of the page fetched for each group, German
+# and English web interface
+NAVIGATION_PAGES = {
+    "tempSettings": (("Einstellungen", "Settings"), ("Temperaturen", "Temperatures")),
+    "temperatures": (("Informationen", "Information"), ("Temperaturen", "Temperatures")),
+    "inputs": (("Informationen", "Information"), ("Eingänge", "Inputs")),
+    "outputs": (("Informationen", "Information"), ("Ausgänge", "Outputs")),
+    "times": (("Informationen", "Information"), ("Ablaufzeiten", "Elapsed times")),
+    "hours": (("Informationen", "Information"), ("Betriebsstunden", "Operating hours")),
+    "deviceinfo": (("Informationen", "Information"), ("Anlagenstatus", "Installation status")),
+    "energy": (("Informationen", "Information"), ("Energie", "Wärmemenge", "Energy", "Heat quantity")),
+}
+
+# (navigation section, item) positions on AIT fw 3.88, used when a page
+# name is not known
+GROUP_POSITIONS = {
+    "tempSettings": (1, 2),
+    "temperatures": (0, 1),
+    "inputs": (0, 2),
+    "outputs": (0, 3),
+    "times": (0, 4),
+    "hours": (0, 5),
+    "deviceinfo": (0, 8),
+    "energy": (0, 9),
+}
+
+
+def buildNavigationIndex(root) -> dict[str, str]:
+    """Map every group to the id of its page, found by section and page name."""
+    pages = {}
+    for section in root:
+        sectionName = section.findtext("name")
+        for page in section.iter("item"):
+            if page is not section:
+                pages.setdefault((sectionName, page.findtext("name")), page.attrib.get("id"))
+
+    ids = {}
+    for group, (sectionNames, pageNames) in NAVIGATION_PAGES.items():
+        itemId = next(
+            (pages[(sectionName, pageName)] for sectionName in sectionNames for pageName in pageNames
+             if pages.get((sectionName, pageName))),
+            None,
+        )
+        if itemId is None:
+            section, item = GROUP_POSITIONS[group]
+            itemId = list(list(root)[section])[item].attrib["id"]
+            _LOGGER.warning("Luxtronik navigation has no known page for "+group+", using its position")
+        ids[group] = itemId
+
+    return ids
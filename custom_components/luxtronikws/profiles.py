@@ -0,0 +1,179 @@
+"""Firmware profiles: which controller items become which entities."""
+from __future__ import annotations
+
+from fnmatch import translate
+from functools import lru_cache
+import logging
+import re
+from typing import NamedTuple
+
+from .activity import OFF_VALUES, ON_VALUES
+from .metrics import COUNTERS
+
+_LOGGER = logging.getLogger(__name__)
+
+# catalog list of each entity class, as stored and read by the platforms
+CATALOG_LISTS = {
+    "temperature": "tempDicts",
+    "pressure": "pressureDicts",
+    "frequency": "frequencyDicts",
+    "percentage": "percentageDicts",
+    "power": "powerDicts",
+    "energy": "energyDicts",
+    "time": "timeDicts",
+    "string": "stringDicts",
+    "binary": "binaryDicts",
+    "hours": "hourDicts",
+    "counter": "counterDicts",
+}
+
+# snapshot groups in the order their entities are listed
+CATALOG_GROUPS = (
+    "deviceinfo", "temperatures", "tempSettings", "inputs", "outputs",
+    "energyOutputs", "energyInputs", "times", "hours",
+)
+
+# One profile per firmware family. firmware holds prefixes of the
+# Softwarestand value the profile applies to. Every rule maps items of its
+# groups to an entity class:
+#   names      item names or fnmatch patterns, exact names are tried first
+#   unit       the raw value has to end with it
+#   values     the raw value has to be one of them
+#   suffix     appended to the item name
+#   precision  suggested display precision of the sensor
+# The first rule that fits an item wins, items without one get no entity.
+# counters names the (group, item name) of every counter in COUNTERS the
+# derived metrics are computed from; without them there are no metrics.
+PROFILES = {
+    "ait-3.88": {
+        "firmware": ("V3.8",),
+        "rules": (
+            {"class": "string", "groups": ("deviceinfo",), "names": ("Betriebszustand",)},
+            {"class": "power", "groups": ("deviceinfo",), "names": ("*",), "unit": "kW", "precision": 2},
+            {"class": "temperature", "groups": ("temperatures",), "names": ("*",), "precision": 1},
+            {
+                "class": "temperature", "groups": ("tempSettings",), "names": ("Rückl.-Begr.", "Hysterese HR"),
+                "precision": 1,
+            },
+            {"class": "binary", "groups": ("inputs", "outputs"), "names": ("*",), "values": ON_VALUES + OFF_VALUES},
+            {"class": "pressure", "groups": ("inputs",), "names": ("*",), "unit": "bar", "precision": 1},
+            {"class": "frequency", "groups": ("outputs",), "names": ("*",), "unit": "Hz"},
+            {"class": "percentage", "groups": ("outputs",), "names": ("*",), "unit": "%"},
+            {
+                "class": "energy", "groups": ("energyOutputs",), "names": ("*",), "unit": "kWh",
+                "suffix": " (output)", "precision": 1,
+            },
+            {
+                "class": "energy", "groups": ("energyInputs",), "names": ("*",), "unit": "kWh",
+                "suffix": " (input)", "precision": 1,
+            },
+            {"class": "time", "groups": ("times",), "names": ("*",)},
+            {"class": "counter", "groups": ("hours",), "names": ("Impulse *",)},
+            {"class": "time", "groups": ("hours",), "names": ("Durchschn.Laufzeit *",)},
+            {"class": "hours", "groups": ("hours",), "names": ("*",), "unit": "h"},
+        ),
+        "counters": {
+            "heat": ("energyOutputs", "Gesamt"),
+            "electricity": ("energyInputs", "Gesamt"),
+            "compressor_hours": ("hours", "Betriebstund. VD1"),
+            "compressor_starts": ("hours", "Impulse VD1"),
+        },
+    },
+}
+
+# used for firmwares no profile claims
+DEFAULT_PROFILE = "ait-3.88"
+
+
+def profileName(firmware: str) -> str:
+    """Name of the profile for a Softwarestand value."""
+    for name, profile in PROFILES.items():
+        if firmware.startswith(profile["firmware"]):
+            return name
+    _LOGGER.warning("No Luxtronik profile for firmware "+firmware+", using "+DEFAULT_PROFILE)
+    return DEFAULT_PROFILE
+
+
+class ProfileRule(NamedTuple):
+    """A rule of a profile as it is looked up."""
+
+    catalogList: str
+    unit: str | None
+    values: frozenset | None
+    suffix: str
+    precision: int | None
+
+    def fits(self, raw: str) -> bool:
+        if self.unit is not None and not raw.endswith(self.unit):
+            return False
+        return self.values is None or raw in self.values
+
+
+def _isPattern(name: str) -> bool:
+    return any(char in name for char in "*?[")
+
+
+class ProfileIndex:
+    """A profile compiled for lookups.
+
+    Rules for exact item names are kept in a dict keyed by (group, name),
+    the few pattern rules of each group in a list tried after them, so
+    classifying a snapshot is one pass over its items.
+    """
+
+    def __init__(self, profile: dict) -> None:
+        counters = profile.get("counters")
+        # (group, item name) of every counter, in the order of COUNTERS
+        self.counters = tuple(counters[name] for name in COUNTERS) if counters is not None else None
+        self._attr_names: dict[tuple[str, str], list] = {}
+        self._attr_patterns: dict[str, list] = {}
+        for rule in profile["rules"]:
+            compiled = ProfileRule(
+                CATALOG_LISTS[rule["class"]],
+                rule.get("unit"),
+                frozenset(rule["values"]) if "values" in rule else None,
+                rule.get("suffix", ""),
+                rule.get("precision"),
+            )
+            for group in rule["groups"]:
+                for name in rule["names"]:
+                    if _isPattern(name):
+                        pattern = re.compile(translate(name))
+                        self._attr_patterns.setdefault(group, []).append((pattern, compiled))
+                    else:
+                        self._attr_names.setdefault((group, name), []).append(compiled)
+
+    def classify(self, group: str, name: str, raw: str) -> ProfileRule | None:
+        """Rule of the first fitting entity class, None if the item gets no entity."""
+        for rule in self._attr_names.get((group, name), ()):
+            if rule.fits(raw):
+                return rule
+        for pattern, rule in self._attr_patterns.get(group, ()):
+            if pattern.match(name) and rule.fits(raw):
+                return rule
+        return None
+
+    def catalog(self, snapshot, typeValue: str, swValue: str) -> dict[str, list]:
+        """Entity dicts of every item of the snapshot, by catalog list."""
+        catalog = {catalogList: [] for catalogList in CATALOG_LISTS.values()}
+        for group in CATALOG_GROUPS:
+            items = snapshot.groups.get(group)
+            if items is None:
+                continue
+            for index, name, raw in zip(items.indices, items.names, items.raws):
+                rule = self.classify(group, name, raw)
+                if rule is None:
+                    continue
+                entityDict = {
+                    "type": typeValue, "sw": swValue, "name": name+rule.suffix, "index": index, "group": group,
+                }
+                if rule.precision is not None:
+                    entityDict["precision"] = rule.precision
+                catalog[rule.catalogList].append(entityDict)
+        return catalog
+
+
+@lru_cache(maxsize=None)
+def profileIndex(name: str) -> ProfileIndex:
+    """Compiled profile, built once per profile."""
+    return ProfileIndex(PROFILES[name])
@@ -0,0 +1,187 @@
+"""Record the raw GET replies to disk and play them back."""
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import RECORDER_BACKUPS
+from .navigation import NAVIGATION_PAGES
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LuxtronikRecorder:
+    """Append the raw replies of every poll to a gzip file, rotated by size.
+
+    Each poll is one JSON line {"t": unix time, "replies": {group: xml}}.
+    The line is compressed and flushed in the executor; while a write is
+    still pending, further polls are dropped instead of queued, so memory
+    stays bounded when the disk is slow. When the file grows past maxBytes
+    it is renamed to path.1 (older ones shift up to path.<backups>).
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str, maxBytes: int, backups: int = RECORDER_BACKUPS) -> None:
+        self._attr_hass = hass
+        self._attr_path = path
+        self._attr_max_bytes = maxBytes
+        self._attr_backups = backups
+        self._attr_file = None
+        self._attr_lock = threading.Lock()
+        self._attr_pending = False
+        self._attr_dropped = 0
+
+    @property
+    def path(self) -> str:
+        return self._attr_path
+
+    @property
+    def dropped(self) -> int:
+        """Polls not recorded because the previous write was still pending."""
+        return self._attr_dropped
+
+    @callback
+    def record(self, replies: dict[str, str]) -> None:
+        """Queue the replies of one poll for writing."""
+        if self._attr_pending:
+            self._attr_dropped += 1
+            return
+        self._attr_pending = True
+        line = json.dumps({"t": round(time.time(), 3), "replies": replies}, ensure_ascii=False)
+        future = self._attr_hass.async_add_executor_job(self._write, line.encode("utf-8") + b"\n")
+        future.add_done_callback(self._written)
+
+    def _written(self, future) -> None:
+        self._attr_pending = False
+        if not future.cancelled() and future.exception() is not None:
+            _LOGGER.warning("Luxtronik recorder could not write "+self._attr_path+": "+str(future.exception()))
+
+    def _write(self, line: bytes) -> None:
+        with self._attr_lock:
+            if self._attr_file is None:
+                os.makedirs(os.path.dirname(self._attr_path), exist_ok=True)
+                # appending starts a new gzip member, readers see one stream
+                self._attr_file = gzip.open(self._attr_path, "ab")
+            self._attr_file.write(line)
+            # sync flush, so a crash loses at most the poll being written
+            self._attr_file.flush()
+            if os.path.getsize(self._attr_path) >= self._attr_max_bytes:
+                self._rotate()
+
+    def _rotate(self) -> None:
+        self._attr_file.close()
+        self._attr_file = None
+        for number in range(self._attr_backups - 1, 0, -1):
+            older = self._attr_path+"."+str(number)
+            if os.path.exists(older):
+                os.replace(older, self._attr_path+"."+str(number + 1))
+        os.replace(self._attr_path, self._attr_path+".1")
+
+    def close(self) -> None:
+        with self._attr_lock:
+            if self._attr_file is not None:
+                self._attr_file.close()
+                self._attr_file = None
+
+    async def async_close(self) -> None:
+        await self._attr_hass.async_add_executor_job(self.close)
+
+
+def recordingFiles(path: str) -> list[str]:
+    """The recording at path and its rotated parts, oldest first."""
+    files = []
+    number = 1
+    while os.path.exists(path+"."+str(number)):
+        files.insert(0, path+"."+str(number))
+        number += 1
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def readRecording(path: str):
+    """Yield (unix time, replies) for every poll of a recording, oldest first.
+
+    A part cut off in the middle of a write, e.g. by a crash, ends early.
+    """
+    for fileName in recordingFiles(path):
+        with gzip.open(fileName, "rb") as file:
+            try:
+                for line in file:
+                    record = json.loads(line)
+                    yield record["t"], record["replies"]
+            except (EOFError, ValueError):
+                _LOGGER.warning("Luxtronik recording "+fileName+" is truncated")
+
+
+def replayNavigation():
+    """Navigation tree whose page ids are the group names."""
+    root = ET.Element("Navigation", id="replay")
+    sections = {}
+    for group, (sectionNames, pageNames) in NAVIGATION_PAGES.items():
+        section = sections.get(sectionNames[0])
+        if section is None:
+            section = sections[sectionNames[0]] = ET.SubElement(root, "item", id=sectionNames[0])
+            ET.SubElement(section, "name").text = sectionNames[0]
+        page = ET.SubElement(section, "item", id=group)
+        ET.SubElement(page, "name").text = pageNames[0]
+    return root
+
+
+class ReplaySession:
+    """Stands in for LuxtronikSession and answers from a recording, see ControllerSession.
+
+    Polls are answered one recorded poll at a time via advance(). Groups
+    the recorded poll did not fetch are answered with their last recorded
+    reply, so the coordinator can fetch every group on every poll.
+    """
+
+    def __init__(self) -> None:
+        self._attr_root = replayNavigation()
+        self._attr_replies: dict[str, str] = {}
+        self._attr_stats = None
+
+    @property
+    def stats(self):
+        return self._attr_stats
+
+    @stats.setter
+    def stats(self, stats) -> None:
+        self._attr_stats = stats
+
+    @property
+    def server(self) -> str:
+        return "replay"
+
+    @property
+    def root(self):
+        return self._attr_root
+
+    @property
+    def connected(self) -> bool:
+        return True
+
+    def advance(self, replies: dict[str, str]) -> None:
+        """Make the replies of the next recorded poll current."""
+        self._attr_replies.update(replies)
+
+    async def async_login(self, navigation: bool = True) -> None:
+        pass
+
+    async def async_ensure(self, navigation: bool = True) -> None:
+        pass
+
+    async def async_fetch(self, ids: dict[str, str], timeout: float, replies: dict | None = None):
+        if replies is None:
+            replies = {}
+        replies.update((group, self._attr_replies[group]) for group in ids if group in self._attr_replies)
+        return replies, [group for group in ids if group not in replies]
+
+    async def async_close(self) -> None:
+        pass
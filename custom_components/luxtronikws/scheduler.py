@@ -0,0 +1,135 @@
+"""Integration-wide poll scheduler for all Luxtronik controllers."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import DOMAIN, MAX_CONCURRENT_FETCHES, SCHEDULER
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def getScheduler(hass: HomeAssistant) -> LuxtronikScheduler:
+    """Return the scheduler shared by all config entries, creating it on first use."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if SCHEDULER not in data:
+        data[SCHEDULER] = LuxtronikScheduler(hass)
+    return data[SCHEDULER]
+
+
+class LuxtronikScheduler:
+    """Poll every controller on its own interval, spread evenly over it.
+
+    Controller n of N polls at phase n/N of its interval, so with several
+    units the connects and parses do not all land on the same tick. At most
+    MAX_CONCURRENT_FETCHES polls run at the same time.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._attr_hass = hass
+        self._attr_coordinators = []
+        self._attr_timers: dict[object, CALLBACK_TYPE] = {}
+        self._attr_latencies: dict[object, dict] = {}
+        self._attr_running = set()
+        self._attr_semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+
+    @callback
+    def async_add(self, coordinator, refreshNow: bool = False) -> CALLBACK_TYPE:
+        """Start polling a coordinator, returns a callback that stops it.
+
+        With refreshNow the first poll starts right away instead of at the
+        phase of the coordinator.
+        """
+        self._attr_coordinators.append(coordinator)
+        self._attr_latencies[coordinator] = {"wait": None, "poll": None, "polls": 0}
+        self._reschedule()
+        if refreshNow:
+            self._attr_running.add(coordinator)
+            self._attr_hass.async_create_task(self._poll(coordinator))
+
+        @callback
+        def remove() -> None:
+            self.async_remove(coordinator)
+
+        return remove
+
+    @callback
+    def async_remove(self, coordinator) -> None:
+        if coordinator not in self._attr_coordinators:
+            return
+        self._attr_coordinators.remove(coordinator)
+        self._attr_latencies.pop(coordinator, None)
+        self._cancel(coordinator)
+        self._reschedule()
+
+    @callback
+    def async_poll_now(self, coordinator) -> None:
+        """Poll a coordinator right away, unless a poll of it is already running."""
+        if coordinator in self._attr_coordinators and coordinator not in self._attr_running:
+            self._attr_running.add(coordinator)
+            self._attr_hass.async_create_task(self._poll(coordinator))
+
+    def latencies(self) -> dict[str, dict]:
+        """Last queue wait and poll duration of every controller, keyed by server."""
+        return {coordinator.server: dict(latency) for coordinator, latency in self._attr_latencies.items()}
+
+    def _cancel(self, coordinator) -> None:
+        unsub = self._attr_timers.pop(coordinator, None)
+        if unsub is not None:
+            unsub()
+
+    @callback
+    def _reschedule(self) -> None:
+        for coordinator in self._attr_coordinators:
+            self._schedule(coordinator)
+
+    @callback
+    def _schedule(self, coordinator) -> None:
+        self._cancel(coordinator)
+        interval = coordinator.pollInterval.total_seconds()
+        phase = self._attr_coordinators.index(coordinator) / len(self._attr_coordinators) * interval
+        now = time.monotonic()
+        # next point in time that is phase seconds past a multiple of interval
+        due = phase + math.floor((now - phase) / interval + 1) * interval
+
+        @callback
+        def run(_now) -> None:
+            self._attr_timers.pop(coordinator, None)
+            # a poll still running schedules the next one when it is done
+            if coordinator not in self._attr_running:
+                self._attr_hass.async_create_task(self._poll(coordinator))
+
+        self._attr_timers[coordinator] = async_call_later(self._attr_hass, due - now, run)
+
+    async def _poll(self, coordinator) -> None:
+        self._attr_running.add(coordinator)
+        try:
+            if self._attr_hass.is_stopping or coordinator not in self._attr_coordinators:
+                return
+
+            entry = coordinator.config_entry
+            if coordinator.hasListeners and not (entry and entry.pref_disable_polling):
+                queued = time.monotonic()
+                async with self._attr_semaphore:
+                    wait = time.monotonic() - queued
+                    await coordinator.async_refresh()
+
+                latency = self._attr_latencies.get(coordinator)
+                if latency is not None:
+                    latency["wait"] = wait
+                    latency["poll"] = coordinator.pollDuration
+                    latency["polls"] += 1
+                _LOGGER.debug(
+                    "Luxtronik "+coordinator.server+" polled, waited "+str(round(wait, 3))
+                    +" s, poll took "+str(round(coordinator.pollDuration or 0, 3))+" s"
+                )
+        finally:
+            self._attr_running.discard(coordinator)
+
+        if coordinator in self._attr_coordinators:
+            self._schedule(coordinator)
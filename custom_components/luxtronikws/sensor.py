@@ -1,13 +1,12 @@
 """Platform for sensor integration."""
 from __future__ import annotations
-from datetime import datetime, timedelta
-import locale
 
 import logging
+import time
 
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
-    SensorEntity,
     SensorStateClass,
 )
 from homeassistant.const import (
@@ -20,14 +19,14 @@ from homeassistant.const import (
     UnitOfTime)
 
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import EntityCategory
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.helpers.device_registry import DeviceInfo
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-)
 
-from .coordinator import LuxtronikCoordinator
+from .entity import LuxtronikCoordinatorEntity, removeEntities
+from .metrics import METRICS, OBSOLETE_METRICS
+from .stats import POLL_PHASES
 
 from .const import (
     DOMAIN,
@@ -44,14 +43,8 @@ async def async_setup_entry(
     _LOGGER.info("sensor async setup entry called, title:" + config_entry.title)
     # Set up the sensor platform.
 
-    localCoordinator = LuxtronikCoordinator(
-        hass,
-        config_entry.data["server"],
-        config_entry.data["password"],
-        config_entry.data["update_interval"],
-    )
-    await localCoordinator.async_config_entry_first_refresh()
-    dicts = localCoordinator.listEntities()
+    localCoordinator = hass.data[DOMAIN][config_entry.entry_id]
+    dicts = localCoordinator.catalog
 
     entities = []
     for dict in dicts["tempDicts"]:
@@ -75,9 +68,26 @@ async def async_setup_entry(
     for dict in dicts["hourDicts"]:
         entities.append(LuxtronikHoursEntity(dict, localCoordinator, hass))
 
-    async_add_entities(entities)
+    # every entity dict carries the model and firmware of the controller
+    first = next(dict for dictList in dicts.values() for dict in dictList)
+    typeValue = first["type"]
+    swValue = first["sw"]
+    for phase in POLL_PHASES:
+        entities.append(LuxtronikStatsEntity(
+            {"type": typeValue, "sw": swValue, "name": "Poll "+phase.replace("_", " "), "index": phase, "group": "stats"},
+            localCoordinator, hass, config_entry.entry_id))
+    for metric, window in METRICS:
+        entities.append(LuxtronikMetricEntity(
+            {
+                "type": typeValue, "sw": swValue, "name": metricName(metric, window),
+                "index": metric+"_"+window, "group": "metrics", "metric": metric, "window": window,
+            },
+            localCoordinator, hass, config_entry.entry_id))
+    removeEntities(hass, "sensor", [
+        config_entry.entry_id+"_metric_"+metric+"_"+window for metric, window in OBSOLETE_METRICS
+    ])
 
-    hass.data.setdefault(DOMAIN, {})[config_entry.entry_id] = localCoordinator
+    async_add_entities(entities)
     _LOGGER.debug(
         "async setup entry finished, server:"
         + config_entry.data["server"]
@@ -87,64 +97,88 @@ async def async_setup_entry(
         + str(config_entry.data["update_interval"])
     )
 
-class LuxtronikEntity(SensorEntity, CoordinatorEntity):
+def metricName(metric: str, window: str) -> str:
+    name = {
+        "cop": "COP",
+        "heat_per_compressor_hour": "Heat per compressor hour",
+        "cycles_per_hour": "Compressor cycles per hour",
+    }[metric]
+    return name if window == "last" else name+" last "+window
+
+
+class LuxtronikEntity(RestoreSensor, LuxtronikCoordinatorEntity):
     """Representation of a Luxtronik Device entity"""
     def __init__(
         self, entityDict, coordinator, hass: HomeAssistant
     ) -> None:
         """Pass coordinator to CoordinatorEntity."""
-        super().__init__(coordinator, context=entityDict["name"])
-        self._attr_device_id = entityDict["name"]
-        self._attr_hass = hass
-        self._attr_device_model = entityDict["type"]
-        self._attr_sw_version = entityDict["sw"]
-        self._attr_index = entityDict["index"]
-        self._attr_group = entityDict["group"]
-        self._attr_has_entity_name = True
-        self._attr_name = entityDict["name"]
-        self._attr_friendly_name = entityDict["name"]
-        self._attr_suffix_len = 0
-        _LOGGER.debug("Luxtronik entity "+entityDict["name"] +" created")
+        super().__init__(entityDict, coordinator)
+        # deadband and minimum interval of the sensor class, None writes
+        # every change
+        self._attr_throttle = None
+        # value, availability and monotonic time of the last state write
+        self._attr_published = None
+        # timer writing a held back value
+        self._attr_flush = None
+        if "precision" in entityDict:
+            self._attr_suggested_display_precision = entityDict["precision"]
 
-    @property
-    def unique_id(self) -> str | None:
-        return self._attr_device_id + str(self._attr_index)
-
-    def stripSuffix(self) -> str:
-        """strip extra characters from data"""
-        root = self.coordinator.data[self._attr_group]
-        listed = list(root)
-        item = listed[self._attr_index]
-        valuestr = list(item)[1].text
-        valuestr = valuestr[:len(valuestr)-self._attr_suffix_len]
-        point = locale.localeconv()["decimal_point"]
-        valuestr.replace(".", point)
-        valuestr.replace(",", point)
-        return valuestr
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator, unless the throttle holds it back."""
+        self.updateValue()
+        if self.holdBack():
+            self.coordinator.countThrottled()
+            return
+        self.publish()
 
+    def holdBack(self) -> bool:
+        """Whether the new value is held back, a timer writes it later if so."""
+        if self._attr_throttle is None or self._attr_published is None:
+            return False
+        value, available, published = self._attr_published
+        now = time.monotonic()
+        wait = None
+        if available == self.available:
+            wait = self._attr_throttle.holdBack(self._attr_native_value, value, now - published)
+        if wait is None:
+            return False
+        if self._attr_flush is None:
+            self._attr_flush = async_call_later(self.hass, wait, self.flush)
+        return True
 
     @callback
-    def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
-        self._attr_native_value = self.stripSuffix()
+    def flush(self, _now) -> None:
+        self._attr_flush = None
+        self.updateValue()
+        if not self.holdBack():
+            self.publish()
+
+    def publish(self) -> None:
+        self._attr_published = (self._attr_native_value, self.available, time.monotonic())
         _LOGGER.debug("Luxtronik sensor polled")
         self.async_write_ha_state()
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device info."""
-        manuf = "ACME"
-        if self._attr_device_model.startswith("MSW"):
-            manuf = "Alpha Innotec"
-
-        return DeviceInfo(
-            identifiers={(DOMAIN, self._attr_device_model)},
-            name=self._attr_device_model,
-            model=self._attr_device_model,
-            suggested_area="Kitchen",
-            manufacturer=manuf,
-            sw_version=self._attr_sw_version,
-        )
+    @callback
+    def cancelFlush(self) -> None:
+        if self._attr_flush is not None:
+            self._attr_flush()
+            self._attr_flush = None
+
+    def updateValue(self) -> None:
+        """Take the number decoded by the coordinator, unknown if the value is not one."""
+        item = self.item()
+        value = item.value if item is not None else None
+        self._attr_native_value = value if isinstance(value, (int, float)) else None
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(self.cancelFlush)
+
+    async def restoreValue(self) -> None:
+        restored = await self.async_get_last_sensor_data()
+        if restored is not None:
+            self._attr_native_value = restored.native_value
 
 class LuxtronikTemperatureEntity(LuxtronikEntity):
     """Representation of a Luxtronik Device entity"""
@@ -153,10 +187,10 @@ class LuxtronikTemperatureEntity(LuxtronikEntity):
     ) -> None:
         """Pass coordinator to CoordinatorEntity."""
         super().__init__(entityDict, coordinator, hass)
+        self._attr_throttle = coordinator.throttle("temperature")
         self._attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
         self._attr_device_class = SensorDeviceClass.TEMPERATURE
         self._attr_state_class = SensorStateClass.MEASUREMENT
-        self._attr_suffix_len = 2
         _LOGGER.debug("Luxtronik entity "+entityDict["name"] +" created")
 
 class LuxtronikPressureEntity(LuxtronikEntity):
@@ -166,10 +200,10 @@ class LuxtronikPressureEntity(LuxtronikEntity):
     ) -> None:
         """Pass coordinator to CoordinatorEntity."""
         super().__init__(entityDict, coordinator, hass)
+        self._attr_throttle = coordinator.throttle("pressure")
         self._attr_native_unit_of_measurement = UnitOfPressure.BAR
         self._attr_device_class = SensorDeviceClass.PRESSURE
         self._attr_state_class = SensorStateClass.MEASUREMENT
-        self._attr_suffix_len = 4
 
 class LuxtronikFrequencyEntity(LuxtronikEntity):
     """Representation of a Luxtronik Device entity"""
@@ -178,10 +212,10 @@ class LuxtronikFrequencyEntity(LuxtronikEntity):
     ) -> None:
         """Pass coordinator to CoordinatorEntity."""
         super().__init__(entityDict, coordinator, hass)
+        self._attr_throttle = coordinator.throttle("frequency")
         self._attr_native_unit_of_measurement = UnitOfFrequency.HERTZ
         self._attr_device_class = SensorDeviceClass.FREQUENCY
         self._attr_state_class = SensorStateClass.MEASUREMENT
-        self._attr_suffix_len = 3
 
 class LuxtronikPercentageEntity(LuxtronikEntity):
     """Representation of a Luxtronik Device entity"""
@@ -190,10 +224,10 @@ class LuxtronikPercentageEntity(LuxtronikEntity):
     ) -> None:
         """Pass coordinator to CoordinatorEntity."""
         super().__init__(entityDict, coordinator, hass)
+        self._attr_throttle = coordinator.throttle("percentage")
         self._attr_native_unit_of_measurement = PERCENTAGE
         self._attr_device_class = None
         self._attr_state_class = SensorStateClass.MEASUREMENT
-        self._attr_suffix_len = 2
         self._attr_icon = "mdi:pump" # the only known instances of luxtronik percentage entities are pumps
 
 class LuxtronikPowerEntity(LuxtronikEntity):
@@ -203,10 +237,10 @@ class LuxtronikPowerEntity(LuxtronikEntity):
     ) -> None:
         """Pass coordinator to CoordinatorEntity."""
         super().__init__(entityDict, coordinator, hass)
+        self._attr_throttle = coordinator.throttle("power")
         self._attr_native_unit_of_measurement = UnitOfPower.KILO_WATT
         self._attr_device_class = SensorDeviceClass.POWER
         self._attr_state_class = SensorStateClass.MEASUREMENT
-        self._attr_suffix_len = 3
 
 class LuxtronikEnergyEntity(LuxtronikEntity):
     """Representation of a Luxtronik Device entity"""
@@ -218,7 +252,6 @@ class LuxtronikEnergyEntity(LuxtronikEntity):
         self._attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
         self._attr_device_class = SensorDeviceClass.ENERGY
         self._attr_state_class = SensorStateClass.TOTAL_INCREASING
-        self._attr_suffix_len = 4
 
 class LuxtronikStringEntity(LuxtronikEntity):
     """Representation of a Luxtronik Device entity"""
@@ -230,7 +263,10 @@ class LuxtronikStringEntity(LuxtronikEntity):
         self._attr_native_unit_of_measurement = None
         self._attr_device_class = None
         self._attr_state_class = None
-        self._attr_suffix_len = 0
+
+    def updateValue(self) -> None:
+        item = self.item()
+        self._attr_native_value = item.raw if item is not None else None
 
 class LuxtronikTimeEntity(LuxtronikEntity):
     """Representation of a Luxtronik Device entity"""
@@ -244,24 +280,6 @@ class LuxtronikTimeEntity(LuxtronikEntity):
         self._attr_state_class = SensorStateClass.TOTAL_INCREASING
         self._attr_icon = "mdi:clock-digital"
 
-    @callback
-    def _handle_coordinator_update(self) -> None:
-        """Handle updated data from the coordinator."""
-        root = self.coordinator.data[self._attr_group]
-        listed = list(root)
-        item = listed[self._attr_index]
-        time = list(item)[1].text
-        if time.count(':') == 1:
-            h, m = map(int, time.split(':'))
-            s = 0
-        else:
-            h, m, s = map(int, time.split(':'))
-
-        delta = timedelta(hours=h, minutes=m, seconds=s)
-        self._attr_native_value = str(delta.total_seconds())
-        _LOGGER.debug("Luxtronik sensor polled")
-        self.async_write_ha_state()
-
 class LuxtronikHoursEntity(LuxtronikEntity):
     """Representation of a Luxtronik Device entity"""
     def __init__(
@@ -274,7 +292,6 @@ class LuxtronikHoursEntity(LuxtronikEntity):
         self._attr_suggested_display_precision = 0
         self._attr_device_class = None
         self._attr_state_class = SensorStateClass.TOTAL_INCREASING
-        self._attr_suffix_len = 1
         self._attr_icon = "mdi:counter"
 
 class LuxtronikCounterEntity(LuxtronikEntity):
@@ -287,5 +304,68 @@ class LuxtronikCounterEntity(LuxtronikEntity):
         self._attr_native_unit_of_measurement = None
         self._attr_device_class = None
         self._attr_state_class = SensorStateClass.TOTAL_INCREASING
-        self._attr_suffix_len = 0
-        self._attr_icon = "mdi:counter"
\ No newline at end of file
+        self._attr_icon = "mdi:counter"
+
+class LuxtronikStatsEntity(LuxtronikEntity):
+    """p95 duration of a poll phase, with p50, max and failures as attributes"""
+    def __init__(
+        self, entityDict, coordinator, hass: HomeAssistant, entryId: str
+    ) -> None:
+        """Pass coordinator to CoordinatorEntity."""
+        super().__init__(entityDict, coordinator, hass)
+        # not tied to a value of the snapshot, updated after every poll
+        self.coordinator_context = None
+        self._attr_phase = entityDict["index"]
+        self._attr_entry_id = entryId
+        self._attr_extra_state_attributes = None
+        self._attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+        self._attr_device_class = SensorDeviceClass.DURATION
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+        self._attr_entity_registry_enabled_default = False
+        self._attr_icon = "mdi:timer-outline"
+
+    @property
+    def unique_id(self) -> str | None:
+        return self._attr_entry_id + "_stats_" + self._attr_phase
+
+    @property
+    def available(self) -> bool:
+        # timings are most interesting while polls fail
+        return True
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        return self._attr_extra_state_attributes
+
+    def updateValue(self) -> None:
+        stats = self.coordinator.stats.phase(self._attr_phase).asDict()
+        self._attr_native_value = stats["p95"]
+        self._attr_extra_state_attributes = stats
+
+class LuxtronikMetricEntity(LuxtronikEntity):
+    """Value derived from the energy and compressor counters over a rolling window"""
+    def __init__(
+        self, entityDict, coordinator, hass: HomeAssistant, entryId: str
+    ) -> None:
+        """Pass coordinator to CoordinatorEntity."""
+        super().__init__(entityDict, coordinator, hass)
+        self._attr_metric = entityDict["metric"]
+        self._attr_window = entityDict["window"]
+        self._attr_entry_id = entryId
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        if self._attr_metric == "heat_per_compressor_hour":
+            # kWh of heat per hour of compressor runtime
+            self._attr_native_unit_of_measurement = UnitOfPower.KILO_WATT
+            self._attr_device_class = SensorDeviceClass.POWER
+        else:
+            self._attr_native_unit_of_measurement = None
+            self._attr_device_class = None
+        self._attr_icon = "mdi:heat-pump" if self._attr_metric != "cycles_per_hour" else "mdi:sync"
+
+    @property
+    def unique_id(self) -> str | None:
+        return self._attr_entry_id + "_metric_" + self._attr_index
+
+    def updateValue(self) -> None:
+        self._attr_native_value = self.coordinator.metrics.value(self._attr_metric, self._attr_window)
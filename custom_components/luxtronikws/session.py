@@ -0,0 +1,263 @@
+"""Long-lived websocket session to a Luxtronik controller."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from typing import Protocol
+
+import websockets
+from websockets.protocol import State
+import xml.etree.ElementTree as ET
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .const import DECODE_EXECUTOR_SIZE, KEEPALIVE_INTERVAL, KEEPALIVE_TIMEOUT
+
+_LOGGER = logging.getLogger(__name__)
+
+# id attribute of the root element of a GET reply, e.g. <Content id='0x45e0b0'>
+_REPLY_ID = re.compile(r"""\s*<\w+\s+id=["']([^"']+)["']""")
+
+
+def replyId(result: str) -> str | None:
+    """Return the id of the root element of a reply without parsing it."""
+    match = _REPLY_ID.match(result)
+    return match.group(1) if match else None
+
+
+async def getWebsocket(server, password: str, parse: bool = True, stats=None):
+    """Connect and log in, the phases are timed into stats when given."""
+    start = time.monotonic()
+    try:
+        websocket = await websockets.connect(
+            "ws://"+server+":8214/",
+            subprotocols=["Lux_WS"],
+            ping_interval=KEEPALIVE_INTERVAL,
+            ping_timeout=KEEPALIVE_TIMEOUT,
+        )
+        connected = time.monotonic()
+        if stats is not None:
+            stats.add("connect", connected - start)
+        await websocket.send("LOGIN;"+password)
+        try:
+            result = await websocket.recv()
+            if not result.startswith("<Navigation id="):
+                _LOGGER.critical("luxtronik login response is unknown")
+                await websocket.close()
+                if stats is not None:
+                    stats.fail("login")
+                return None, None, True, False
+
+            if not parse:
+                # caller knows the page ids already, a wrong password shows
+                # up as unanswered GETs
+                _LOGGER.debug("Websocket logged in, navigation not parsed")
+                if stats is not None:
+                    stats.add("login", time.monotonic() - connected)
+                return websocket, None, True, True
+
+            if len(result) > DECODE_EXECUTOR_SIZE:
+                # a large navigation would hold up the event loop
+                root = await asyncio.get_running_loop().run_in_executor(None, ET.fromstring, result)
+            else:
+                root = ET.fromstring(result)
+            if len(root) < 5:
+                _LOGGER.critical("wrong password")
+                await websocket.close()
+                if stats is not None:
+                    stats.fail("login")
+                return None, None, True, False
+
+        except websockets.exceptions.ConnectionClosedError:
+            _LOGGER.critical("Connection closed unexpectedly.")
+            if stats is not None:
+                stats.fail("login")
+            return None, None, True, False
+
+        _LOGGER.debug("Websocket returned:"+result)
+        if stats is not None:
+            stats.add("login", time.monotonic() - connected)
+        return websocket, root, True, True
+    except OSError:
+        _LOGGER.critical("Couldn't connect to websocket")
+        if stats is not None:
+            stats.fail("connect")
+        return None, None, False, False
+
+
+class ControllerUnreachable(UpdateFailed):
+    """No connection to the controller could be opened."""
+
+
+class ControllerSession(Protocol):
+    """What the coordinator needs from a session to the controller.
+
+    LuxtronikSession talks to the controller, ReplaySession answers from a
+    recording; both have to keep to these signatures.
+    """
+
+    stats: object
+
+    @property
+    def server(self) -> str: ...
+
+    @property
+    def root(self): ...
+
+    @property
+    def connected(self) -> bool: ...
+
+    async def async_login(self, navigation: bool = True) -> None: ...
+
+    async def async_ensure(self, navigation: bool = True) -> None: ...
+
+    async def async_fetch(
+        self, ids: dict[str, str], timeout: float, replies: dict | None = None
+    ) -> tuple[dict[str, str], list[str]]: ...
+
+    async def async_close(self) -> None: ...
+
+
+class LuxtronikSession:
+    """Keep one logged-in websocket to the controller open across polls.
+
+    The socket is kept alive with websocket pings. When the controller drops
+    the connection (e.g. after a reboot) the session logs in again the next
+    time it is used.
+    """
+
+    def __init__(self, server: str, password: str, websocket=None, root=None) -> None:
+        """Initialize, optionally adopting an already logged-in websocket."""
+        self._attr_server = server
+        self._attr_password = password
+        self._attr_ws = websocket
+        self._attr_root = root
+        self._attr_invalid = False
+        self._attr_stats = None
+
+    @property
+    def stats(self):
+        """PollStats the login phases and GET round trips are timed into, or None."""
+        return self._attr_stats
+
+    @stats.setter
+    def stats(self, stats) -> None:
+        self._attr_stats = stats
+
+    @property
+    def server(self) -> str:
+        return self._attr_server
+
+    @property
+    def root(self):
+        """Navigation tree returned by the last LOGIN, None if it was not parsed."""
+        return self._attr_root
+
+    @property
+    def connected(self) -> bool:
+        return self._attr_ws is not None and self._attr_ws.state is State.OPEN and not self._attr_invalid
+
+    async def async_login(self, navigation: bool = True) -> None:
+        """Open a new socket and log in, dropping the previous one.
+
+        With navigation False the Navigation reply is not parsed.
+        """
+        await self.async_close()
+        ws, root, connected, loggedin = await getWebsocket(
+            self._attr_server, self._attr_password, navigation, self._attr_stats
+        )
+        if not connected:
+            raise ControllerUnreachable("Couldn't connect to luxtronik at "+self._attr_server)
+        if not loggedin:
+            raise UpdateFailed("Luxtronik login failed at "+self._attr_server)
+
+        self._attr_ws = ws
+        self._attr_root = root
+        _LOGGER.debug("Luxtronik session logged in to "+self._attr_server)
+
+    async def async_ensure(self, navigation: bool = True) -> None:
+        """Log in unless the current socket is still usable.
+
+        With navigation True a session whose Navigation reply was not parsed
+        logs in again to get it.
+        """
+        if not self.connected or (navigation and self._attr_root is None):
+            await self.async_login(navigation)
+
+    async def async_request(self, command: str) -> str:
+        """Send a command and wait for its reply.
+
+        Any error leaves the socket in an unknown state (a late reply could be
+        read as the answer to the next command), so the session is invalidated
+        and will log in again on next use.
+        """
+        try:
+            await self._attr_ws.send(command)
+            return await self._attr_ws.recv()
+        except BaseException:
+            self._attr_invalid = True
+            raise
+
+    async def async_fetch(self, ids: dict[str, str], timeout: float, replies: dict | None = None):
+        """Send GET for every group back to back and collect the replies.
+
+        Replies are matched to their request by the id of the returned root
+        element, so the controller may answer in any order. A reply without
+        an id is assigned to the oldest outstanding request. Requests not
+        answered within timeout seconds are given up.
+
+        Replies are added to replies as they arrive, when given, so the
+        caller keeps them if the fetch is cancelled. Returns the replies
+        keyed by group and the list of groups that timed out.
+        """
+        loop = asyncio.get_running_loop()
+        stats = self._attr_stats
+        pending = {}
+        if replies is None:
+            replies = {}
+        try:
+            for group, itemId in ids.items():
+                sent = loop.time()
+                await self._attr_ws.send("GET;"+itemId)
+                pending[itemId] = (group, sent, sent + timeout)
+
+            while pending:
+                deadline = min(deadline for _, _, deadline in pending.values())
+                try:
+                    result = await asyncio.wait_for(self._attr_ws.recv(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    now = loop.time()
+                    for itemId in [itemId for itemId, (_, _, deadline) in pending.items() if deadline <= now]:
+                        group = pending.pop(itemId)[0]
+                        _LOGGER.warning("Luxtronik did not answer GET for "+group)
+                        if stats is not None:
+                            stats.fail("get_"+group)
+                    continue
+
+                itemId = replyId(result)
+                if itemId is None:
+                    itemId = next(iter(pending))
+                elif itemId not in pending:
+                    # late answer to a request that already timed out
+                    _LOGGER.debug("Discarding unexpected reply for id "+itemId)
+                    continue
+                group, sent, _ = pending.pop(itemId)
+                replies[group] = result
+                if stats is not None:
+                    # time from sending the GET to its reply, including the
+                    # replies queued in front of it
+                    stats.add("get_"+group, loop.time() - sent)
+        except BaseException:
+            self._attr_invalid = True
+            raise
+
+        return replies, [group for group in ids if group not in replies]
+
+    async def async_close(self) -> None:
+        ws = self._attr_ws
+        self._attr_ws = None
+        self._attr_invalid = False
+        if ws is not None:
+            await ws.close()
@@ -0,0 +1,354 @@
+"""Flat, pre-indexed snapshot of the values read from the controller."""
+from __future__ import annotations
+
+from html import unescape
+import logging
+import re
+import sys
+from typing import NamedTuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# a number with a decimal point or comma and an optional unit, which must
+# not start with a digit or a separator, so "4,3°C" is never 4 and ",3°C"
+_NUMBER = re.compile(r"(-?\d+(?:[.,]\d+)?)\s*([^\d,.\s]\S*)?")
+_TIME = re.compile(r"(\d+):(\d\d)(?::(\d\d))?")
+
+
+class SnapshotItem(NamedTuple):
+    """One <item> of a group: its name, value text and decoded value."""
+
+    name: str
+    raw: str
+    value: object
+
+
+def decodeValue(raw: str):
+    """Decode value text to seconds (hh:mm[:ss]), a number (with unit) or the text itself."""
+    if not raw or not (raw[0].isdigit() or raw[0] == "-"):
+        return raw
+
+    if ":" in raw:
+        match = _TIME.fullmatch(raw)
+        if match:
+            h, m, s = match.groups()
+            return int(h) * 3600 + int(m) * 60 + int(s or 0)
+        return raw
+
+    match = _NUMBER.fullmatch(raw)
+    if match:
+        return _converter(match.group(1))(match.group(1))
+
+    return raw
+
+
+def _decimalComma(number: str) -> float:
+    return float(number.replace(",", "."))
+
+
+def _converter(number: str):
+    """int, float or float of a decimal comma, as the number text needs."""
+    if "," in number:
+        return _decimalComma
+    return float if "." in number else int
+
+
+def _isNumeric(raw: str) -> bool:
+    return bool(raw) and (raw[0].isdigit() or raw[0] == "-")
+
+
+def _text(raw: str):
+    # a value that starts to look like a number gets a new parser
+    if _isNumeric(raw):
+        raise ValueError(raw)
+    return raw
+
+
+def _literal(raw: str):
+    # looks like a number but is none, e.g. "---"
+    if decodeValue(raw) is not raw:
+        raise ValueError(raw)
+    return raw
+
+
+def _seconds(raw: str) -> int:
+    match = _TIME.fullmatch(raw)
+    if match is None:
+        raise ValueError(raw)
+    h, m, s = match.groups()
+    return int(h) * 3600 + int(m) * 60 + int(s or 0)
+
+
+def compileParser(raw: str):
+    """Parser for values shaped like raw and the unit raw carries.
+
+    The parser returns what decodeValue would and raises ValueError for a
+    value of another shape, e.g. when the unit text is different.
+    """
+    if _isNumeric(raw):
+        if ":" in raw:
+            if _TIME.fullmatch(raw):
+                return _seconds, None
+        else:
+            match = _NUMBER.fullmatch(raw)
+            if match:
+                number, unit = match.groups()
+                convert = _converter(number)
+                suffix = raw[len(number):]
+                if not suffix:
+                    return convert, None
+
+                cut = len(suffix)
+
+                def parse(raw: str):
+                    if not raw.endswith(suffix):
+                        raise ValueError(raw)
+                    return convert(raw[:-cut])
+
+                return parse, unit
+        return _literal, None
+    return _text, None
+
+
+class ValueDecoder:
+    """Parsers compiled per (group, index) from the first value seen.
+
+    The unit of a value is inferred once, after that every poll only cuts
+    the known suffix and converts the number. A value that no longer fits
+    its parser gets a new one.
+    """
+
+    def __init__(self) -> None:
+        self._attr_parsers: dict[str, list] = {}
+        self._attr_units: dict[str, list] = {}
+
+    def unit(self, group: str, position: int) -> str | None:
+        """Unit text of the value at a position of a group, None for plain numbers and text."""
+        units = self._attr_units.get(group)
+        return units[position] if units is not None and position < len(units) else None
+
+    def decodeGroup(self, group: str, raws: list[str]) -> list:
+        """Decode the values of a group in controller order."""
+        parsers = self._attr_parsers.get(group)
+        if parsers is None or len(parsers) != len(raws):
+            compiled = [compileParser(raw) for raw in raws]
+            parsers = self._attr_parsers[group] = [parser for parser, _ in compiled]
+            self._attr_units[group] = [unit for _, unit in compiled]
+
+        try:
+            return [parser(raw) for parser, raw in zip(parsers, raws)]
+        except ValueError:
+            pass
+
+        # some value changed its shape, compile a new parser for it
+        values = []
+        for position, raw in enumerate(raws):
+            try:
+                values.append(parsers[position](raw))
+            except ValueError:
+                parser, unit = compileParser(raw)
+                parsers[position] = parser
+                self._attr_units[group][position] = unit
+                values.append(parser(raw))
+        return values
+
+
+# One pass over a reply: a leaf <item><name/><value/></item> is a single
+# match, every other start, end or empty tag is matched on its own so the
+# position of each element in its parent can be tracked. Attributes on
+# <value> and text-only children after it (e.g. a unit) are tolerated.
+_TOKEN = re.compile(
+    r"<item\b[^>]*>\s*<name>([^<]*)</name>\s*(?:<value\b[^>]*>([^<]*)</value>|<value\b[^>]*/>)"
+    r"(?:\s*<(?!item\b)(?P<child>[\w:.-]+)\b[^>]*>[^<]*</(?P=child)>|\s*<(?!item\b)[\w:.-]+\b[^>]*/>)*\s*</item>"
+    r"|<(/?)([\w:.-]+)[^>]*?(/?)>"
+)
+
+
+def decodeReply(result: str, emit) -> None:
+    """Stream a GET reply into emit(section, index, name, value).
+
+    No element tree is built, only a stack with the number of children seen
+    so far for each open element. index is the position of the item in its
+    parent. section is None for items directly below the root element and
+    the position of the enclosing section otherwise (nested pages such as
+    energy). An <item> that is neither a name/value leaf nor a section of
+    leaves is skipped with a debug message.
+    """
+    counts = []
+    positions = []
+    # leaf items seen below each open element
+    leaves = []
+    for match in _TOKEN.finditer(result):
+        name, raw, _, closing, tag, empty = match.groups()
+        if name is not None:
+            if not counts:
+                continue
+            index = counts[-1]
+            counts[-1] += 1
+            leaves[-1] += 1
+            raw = raw or ""
+            if "&" in name:
+                name = unescape(name)
+            if "&" in raw:
+                raw = unescape(raw)
+            emit(positions[1] if len(positions) > 1 else None, index, name, raw)
+        elif closing:
+            if counts:
+                counts.pop()
+                position = positions.pop()
+                if not leaves.pop() and tag == "item":
+                    _LOGGER.debug(
+                        "Luxtronik reply has an item without name and value at position "+str(position)+", skipped"
+                    )
+        else:
+            index = 0
+            if counts:
+                index = counts[-1]
+                counts[-1] += 1
+            if not empty:
+                counts.append(0)
+                positions.append(index)
+                leaves.append(0)
+
+
+class SnapshotGroup:
+    """Items of one group in controller order, held in parallel sequences.
+
+    indices, positions and the interned names only change with the layout
+    of the group, so consecutive polls share them; a poll whose values are
+    all unchanged shares raws and values as well.
+    """
+
+    __slots__ = ("indices", "positions", "names", "raws", "values")
+
+    def __init__(self, indices, names, raws: list[str], values: list, previous: SnapshotGroup | None = None) -> None:
+        if previous is not None and previous.indices == tuple(indices) and previous.names == tuple(names):
+            self.indices = previous.indices
+            self.positions = previous.positions
+            self.names = previous.names
+        else:
+            self.indices = tuple(indices)
+            self.positions = {index: position for position, index in enumerate(self.indices)}
+            self.names = tuple(map(sys.intern, names))
+        self.raws = raws
+        self.values = values
+
+    def item(self, index: int) -> SnapshotItem | None:
+        position = self.positions.get(index)
+        if position is None:
+            return None
+        return SnapshotItem(self.names[position], self.raws[position], self.values[position])
+
+    def changedIndices(self, previous: SnapshotGroup | None):
+        """Indices whose name or value differs from the previous poll."""
+        if previous is self:
+            return ()
+        if previous is None or previous.names is not self.names:
+            return self.indices if previous is None else set(self.indices) | set(previous.indices)
+        if previous.raws is self.raws:
+            return ()
+        return [index for index, raw, old in zip(self.indices, self.raws, previous.raws) if raw != old]
+
+
+_EMPTY = SnapshotGroup((), (), [], [])
+
+
+class LuxtronikSnapshot:
+    """Items of all groups, found by (group, index).
+
+    The index is the position of the <item> inside its group, which is what
+    entities store to find their value again. Groups are immutable once
+    added, so a snapshot takes over the groups of the previous poll that
+    were not fetched without copying them.
+    """
+
+    __slots__ = ("groups",)
+
+    def __init__(self) -> None:
+        self.groups: dict[str, SnapshotGroup] = {}
+
+    def get(self, group: str, index: int) -> SnapshotItem | None:
+        items = self.groups.get(group)
+        return items.item(index) if items is not None else None
+
+    def find(self, group: str, name: str) -> SnapshotItem | None:
+        """First item of a group with the given name."""
+        items = self.groups.get(group)
+        if items is None or name not in items.names:
+            return None
+        position = items.names.index(name)
+        return SnapshotItem(items.names[position], items.raws[position], items.values[position])
+
+    def indices(self, group: str) -> tuple[int, ...]:
+        return self.groups.get(group, _EMPTY).indices
+
+    def group(self, group: str) -> list[tuple[int, SnapshotItem]]:
+        """Items of a group in controller order."""
+        items = self.groups.get(group, _EMPTY)
+        return list(zip(items.indices, map(SnapshotItem, items.names, items.raws, items.values)))
+
+    def items(self) -> dict[tuple[str, int], SnapshotItem]:
+        """All items keyed by (group, index), built on demand."""
+        return {(group, index): item for group in self.groups for index, item in self.group(group)}
+
+    def changedKeys(self, previous: LuxtronikSnapshot) -> set[tuple[str, int]]:
+        """Keys whose item differs from the previous snapshot."""
+        old = previous.groups
+        return {
+            (group, index)
+            for group, items in self.groups.items()
+            for index in items.changedIndices(old.get(group))
+        }
+
+    def copyGroups(self, previous: LuxtronikSnapshot, groups) -> None:
+        """Take over whole groups from an earlier snapshot."""
+        for group in groups:
+            items = previous.groups.get(group)
+            if items is not None:
+                self.groups[group] = items
+
+    def addReply(
+        self, group: str, result: str, sections=None, decoder: ValueDecoder | None = None,
+        previous: LuxtronikSnapshot | None = None,
+    ) -> None:
+        """Decode a GET reply into the snapshot.
+
+        sections names the snapshot group of each section of a nested page;
+        items of a flat page all go to group. Values are decoded a group at a
+        time by decoder, or one by one with decodeValue without it. Groups
+        of the previous snapshot whose values did not change are reused
+        without decoding them again.
+        """
+        decoded = {}
+
+        def emit(section, index, name, raw):
+            if sections is None:
+                if section is not None:
+                    return
+                target = group
+            elif section is None or section >= len(sections):
+                return
+            else:
+                target = sections[section]
+            entry = decoded.get(target)
+            if entry is None:
+                entry = decoded[target] = ([], [], [])
+            entry[0].append(index)
+            entry[1].append(name)
+            entry[2].append(raw)
+
+        if sections is None:
+            decoded[group] = ([], [], [])
+        decodeReply(result, emit)
+
+        for target, (indices, names, raws) in decoded.items():
+            prior = previous.groups.get(target) if previous is not None else None
+            if prior is not None and prior.raws == raws:
+                items = SnapshotGroup(indices, names, prior.raws, prior.values, prior)
+            elif decoder is not None:
+                items = SnapshotGroup(indices, names, raws, decoder.decodeGroup(target, raws), prior)
+            else:
+                items = SnapshotGroup(indices, names, raws, [decodeValue(raw) for raw in raws], prior)
+            if prior is not None and items.names is prior.names and items.raws is prior.raws:
+                items = prior
+            self.groups[target] = items
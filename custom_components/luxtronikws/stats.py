@@ -0,0 +1,126 @@
+"""Rolling timing statistics of the poll phases."""
+from __future__ import annotations
+
+from collections import deque
+import time
+
+from .const import DEFAULT_GROUP_INTERVALS, STATS_WINDOW, SUBSCRIBED_GROUPS
+
+# phases timed on every poll, GETs are timed per group as "get_"+group and
+# the REFRESH round trips of subscriptions as "refresh_"+group; "loop" is
+# the time a poll held the event loop, "notify" the entity updates after it
+POLL_PHASES = (
+    ["poll", "loop", "notify", "connect", "login", "parse"]
+    + ["get_"+group for group in DEFAULT_GROUP_INTERVALS]
+    + ["refresh_"+group for group in SUBSCRIBED_GROUPS]
+)
+
+
+class PhaseStats:
+    """Durations of the last STATS_WINDOW runs of one phase and its failure count."""
+
+    def __init__(self) -> None:
+        self._attr_samples = deque(maxlen=STATS_WINDOW)
+        self._attr_count = 0
+        self._attr_failures = 0
+
+    @property
+    def count(self) -> int:
+        return self._attr_count
+
+    @property
+    def failures(self) -> int:
+        return self._attr_failures
+
+    @property
+    def last(self) -> float | None:
+        return self._attr_samples[-1] if self._attr_samples else None
+
+    def add(self, seconds: float) -> None:
+        self._attr_samples.append(seconds)
+        self._attr_count += 1
+
+    def fail(self) -> None:
+        self._attr_failures += 1
+
+    def percentile(self, fraction: float) -> float | None:
+        """Nearest-rank percentile of the samples in the window, in seconds."""
+        if not self._attr_samples:
+            return None
+        samples = sorted(self._attr_samples)
+        return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+    def asDict(self) -> dict:
+        """p50, p95 and max in milliseconds plus the counters."""
+        samples = self._attr_samples
+        return {
+            "p50": _ms(self.percentile(0.5)),
+            "p95": _ms(self.percentile(0.95)),
+            "max": _ms(max(samples) if samples else None),
+            "last": _ms(self.last),
+            "count": self._attr_count,
+            "failures": self._attr_failures,
+        }
+
+
+class PollStats:
+    """Phase statistics of one controller, keyed by phase name."""
+
+    def __init__(self) -> None:
+        self._attr_phases: dict[str, PhaseStats] = {phase: PhaseStats() for phase in POLL_PHASES}
+
+    def phase(self, name: str) -> PhaseStats:
+        if name not in self._attr_phases:
+            self._attr_phases[name] = PhaseStats()
+        return self._attr_phases[name]
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phase(name).add(seconds)
+
+    def fail(self, name: str) -> None:
+        self.phase(name).fail()
+
+    def asDict(self) -> dict[str, dict]:
+        return {name: phase.asDict() for name, phase in self._attr_phases.items()}
+
+
+class LoopTimer:
+    """Await a coroutine and add up the time its steps hold the event loop.
+
+    Every step between two suspensions runs on the loop without yielding,
+    so total is the time the coroutine kept other tasks waiting and
+    longest the worst single stall.
+    """
+
+    def __init__(self, coro) -> None:
+        self._attr_coro = coro
+        self.total = 0.0
+        self.longest = 0.0
+
+    def __await__(self):
+        coro = self._attr_coro
+        send, error = None, None
+        while True:
+            start = time.perf_counter()
+            try:
+                if error is None:
+                    future = coro.send(send)
+                else:
+                    future = coro.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                held = time.perf_counter() - start
+                self.total += held
+                self.longest = max(self.longest, held)
+            try:
+                send, error = (yield future), None
+            except GeneratorExit:
+                coro.close()
+                raise
+            except BaseException as err:
+                send, error = None, err
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 1)
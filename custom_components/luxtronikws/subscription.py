@@ -0,0 +1,108 @@
+"""Stream a page of the controller with REFRESH on a parked session."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from websockets.exceptions import WebSocketException
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from .const import BREAKER_BACKOFF, BREAKER_MAX_BACKOFF, REQUEST_TIMEOUT
+from .session import LuxtronikSession
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LuxtronikSubscription:
+    """Keep a session of its own parked on one group and refresh it.
+
+    The web interface keeps a page open and sends REFRESH, which answers
+    with the content of the page last fetched by GET on the same socket.
+    Every reply is handed to onReply(group, result). After a failure the
+    session logs in again after a pause, doubling up to the breaker
+    maximum while the controller stays down.
+    """
+
+    def __init__(
+        self, server: str, password: str, group: str, pageId, interval: float, onReply, stats=None
+    ) -> None:
+        """pageId() returns the page id of the group, None while it is not known yet."""
+        self._attr_group = group
+        self._attr_page_id = pageId
+        self._attr_interval = interval
+        self._attr_on_reply = onReply
+        self._attr_stats = stats
+        self._attr_session = LuxtronikSession(server, password)
+        self._attr_last_reply = None
+        self._attr_task = None
+
+    @property
+    def group(self) -> str:
+        return self._attr_group
+
+    @property
+    def streaming(self) -> bool:
+        """Whether the last refresh was answered recently enough to skip GETs for the group."""
+        last = self._attr_last_reply
+        return last is not None and time.monotonic() - last < self._attr_interval + REQUEST_TIMEOUT
+
+    def start(self, hass) -> None:
+        if self._attr_task is None:
+            self._attr_task = hass.async_create_background_task(
+                self.run(), "luxtronikws subscription "+self._attr_group
+            )
+
+    async def async_stop(self) -> None:
+        task = self._attr_task
+        self._attr_task = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self._attr_session.async_close()
+
+    async def run(self) -> None:
+        backoff = BREAKER_BACKOFF
+        while True:
+            try:
+                await self.stream()
+            except (UpdateFailed, asyncio.TimeoutError, WebSocketException, OSError) as err:
+                if self._attr_last_reply is not None:
+                    # it was streaming, start over with the shortest pause
+                    backoff = BREAKER_BACKOFF
+                self._attr_last_reply = None
+                if self._attr_stats is not None:
+                    self._attr_stats.fail("refresh_"+self._attr_group)
+                _LOGGER.info(
+                    "Luxtronik subscription to "+self._attr_group+" failed ("+str(err)
+                    +"), polling it until it is back in "+str(backoff)+" s"
+                )
+                await self._attr_session.async_close()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, BREAKER_MAX_BACKOFF)
+                continue
+            # stream only returns while the page id is not known yet
+            await asyncio.sleep(self._attr_interval)
+
+    async def stream(self) -> None:
+        pageId = self._attr_page_id()
+        if pageId is None:
+            return
+
+        session = self._attr_session
+        await session.async_login(navigation=False)
+        command = "GET;"+pageId
+        while True:
+            start = time.monotonic()
+            result = await asyncio.wait_for(session.async_request(command), REQUEST_TIMEOUT)
+            now = time.monotonic()
+            if self._attr_stats is not None and command == "REFRESH":
+                self._attr_stats.add("refresh_"+self._attr_group, now - start)
+            self._attr_last_reply = now
+            self._attr_on_reply(self._attr_group, result)
+            command = "REFRESH"
+            await asyncio.sleep(max(self._attr_interval - (time.monotonic() - start), 0))
@@ -0,0 +1,61 @@
+"""Deadband and minimum interval between state writes of a sensor."""
+from __future__ import annotations
+
+import math
+
+
+def parseDeadband(text: str) -> tuple[float, bool]:
+    """Deadband and whether it is relative from "0.2" or "5%", ValueError if neither.
+
+    float() also takes "nan" and "inf", which would hold back every change
+    until the heartbeat, so only finite deadbands are accepted.
+    """
+    text = text.strip()
+    relative = text.endswith("%")
+    deadband = float(text[:-1] if relative else text)
+    if not math.isfinite(deadband) or deadband < 0:
+        raise ValueError(text)
+    return deadband, relative
+
+
+class PublishThrottle:
+    """When a new value of a sensor class should be written.
+
+    A change smaller than the deadband is held back until the heartbeat,
+    any change is held back until minInterval has passed since the last
+    write.
+    """
+
+    def __init__(self, deadband: float, relative: bool, minInterval: float, heartbeat: float) -> None:
+        self._attr_deadband = deadband
+        self._attr_relative = relative
+        self._attr_min_interval = minInterval
+        self._attr_heartbeat = heartbeat
+
+    @classmethod
+    def fromOptions(cls, deadband: str, minInterval: float, heartbeat: float) -> PublishThrottle | None:
+        """Throttle from the option values, None if it would never hold anything back."""
+        band, relative = parseDeadband(deadband)
+        if band == 0 and minInterval == 0:
+            return None
+        return cls(band, relative, minInterval, heartbeat)
+
+    def holdBack(self, value, published, age: float) -> float | None:
+        """Seconds to hold value back, None to write it now.
+
+        published is the value last written age seconds ago. Only a number
+        replacing a different number is ever held back.
+        """
+        if (
+            value == published
+            or not isinstance(value, (int, float))
+            or not isinstance(published, (int, float))
+            or age >= self._attr_heartbeat
+        ):
+            return None
+        if age < self._attr_min_interval:
+            return self._attr_min_interval - age
+        limit = abs(published) * self._attr_deadband / 100 if self._attr_relative else self._attr_deadband
+        if abs(value - published) < limit:
+            return self._attr_heartbeat - age
+        return None